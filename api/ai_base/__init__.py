@@ -1,2 +1,4 @@
 from .ai_title_generator import generate_chat_title
-from .base_ai_agent import create_agent_executor as base_ai_agent
\ No newline at end of file
+from .base_ai_agent import create_agent_executor as base_ai_agent, DEFAULT_SYSTEM_PROMPT, CHAT_MODEL
+from .async_mongo_saver import AsyncMongoDBSaver
+from .agent_registry import get_agent, agent_registry
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Sequence
+
+from config import AGENT_CACHE_SIZE
+from .base_ai_agent import create_agent_executor, create_chat_llm, tools as default_tools, DEFAULT_SYSTEM_PROMPT
+
+
+class AgentRegistry:
+    """Process-wide cache of compiled chat agents.
+
+    Agents are keyed by (model, system prompt, tool set). The default prompt
+    agents are pinned; agents built for custom prompts are evicted LRU once
+    more than `max_custom` of them are cached. All agents of a model share
+    one `ChatOpenAI` client and therefore one HTTP connection pool.
+    """
+
+    def __init__(self, max_custom: int = AGENT_CACHE_SIZE):
+        self.max_custom = max_custom
+        self._pinned = {}
+        self._custom = OrderedDict()
+        self._llms = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(model_name: str, system_prompt: str, tools: Sequence) -> tuple:
+        return model_name, system_prompt, tuple(sorted(t.name for t in tools))
+
+    def get(
+        self,
+        model_name: str,
+        system_prompt: Optional[str] = None,
+        tools: Optional[Sequence] = None,
+    ):
+        system_prompt = system_prompt or DEFAULT_SYSTEM_PROMPT
+        tools = list(tools) if tools is not None else default_tools
+        key = self._key(model_name, system_prompt, tools)
+        pinned = system_prompt == DEFAULT_SYSTEM_PROMPT
+
+        with self._lock:
+            if pinned and key in self._pinned:
+                return self._pinned[key]
+            if not pinned and key in self._custom:
+                self._custom.move_to_end(key)
+                return self._custom[key]
+
+            agent = create_agent_executor(
+                model_name=model_name,
+                system_prompt=system_prompt,
+                agent_tools=tools,
+                llm=self._get_llm(model_name),
+            )
+
+            if pinned:
+                self._pinned[key] = agent
+            else:
+                self._custom[key] = agent
+                while len(self._custom) > self.max_custom:
+                    self._custom.popitem(last=False)
+
+            return agent
+
+    def _get_llm(self, model_name: str):
+        llm = self._llms.get(model_name)
+        if llm is None:
+            llm = self._llms[model_name] = create_chat_llm(model_name)
+        return llm
+
+    async def warmup(self, model_name: str) -> None:
+        """Build the default agent and open its HTTPS connection to OpenRouter"""
+        self.get(model_name)
+        await self._llms[model_name].root_async_client.models.list()
+
+    async def aclose(self) -> None:
+        """Drop cached agents and close their HTTP clients"""
+        with self._lock:
+            llms = list(self._llms.values())
+            self._llms.clear()
+            self._pinned.clear()
+            self._custom.clear()
+
+        for llm in llms:
+            await llm.root_async_client.close()
+            llm.root_client.close()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pinned.clear()
+            self._custom.clear()
+
+    def __len__(self) -> int:
+        return len(self._pinned) + len(self._custom)
+
+
+agent_registry = AgentRegistry()
+
+
+def get_agent(model_name: str, system_prompt: Optional[str] = None, tools: Optional[Sequence] = None):
+    """Return a cached compiled agent, building it on first use"""
+    return agent_registry.get(model_name, system_prompt, tools)
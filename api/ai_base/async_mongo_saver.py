@@ -0,0 +1,269 @@
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Any, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.mongodb.utils import dumps_metadata, loads_metadata
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, UpdateOne
+
+
+class AsyncMongoDBSaver(BaseCheckpointSaver):
+    """Fully async LangGraph checkpointer on a Motor database.
+
+    Stores documents in the same layout as `langgraph.checkpoint.mongodb.MongoDBSaver`,
+    but never blocks the event loop: every read and write is awaited on the
+    Motor connection pool shared with the routers. Only the async API is
+    implemented, which is all `astream_events` needs.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        checkpoint_collection_name: str = "langgraph_checkpoints",
+        writes_collection_name: str = "langgraph_checkpoint_writes",
+        ttl: Optional[int] = None,
+    ) -> None:
+        super().__init__()
+        self.db = db
+        self.checkpoint_collection = db[checkpoint_collection_name]
+        self.writes_collection = db[writes_collection_name]
+        self.ttl = ttl
+        self._is_setup = False
+
+    # Collections the previous MongoDBSaver wrote to (it ignored `collection_name`)
+    LEGACY_COLLECTIONS = ("checkpoints", "checkpoint_writes")
+
+    async def migrate_legacy_collections(self) -> None:
+        """Rename the old saver's collections to ours so existing chats keep their state
+
+        Runs before `setup`. A target that is missing or still empty (e.g.
+        created by `setup` after an earlier failed migration) is replaced.
+        """
+        existing = set(await self.db.list_collection_names())
+        targets = (self.checkpoint_collection, self.writes_collection)
+        for legacy, target in zip(self.LEGACY_COLLECTIONS, targets):
+            if legacy not in existing:
+                continue
+            if target.name in existing and await target.estimated_document_count() > 0:
+                print(f"Checkpoints: both '{legacy}' and '{target.name}' hold data, leaving '{legacy}' as is")
+                continue
+            await self.db[legacy].rename(target.name, dropTarget=True)
+            print(f"Checkpoints: renamed '{legacy}' to '{target.name}'")
+
+    async def setup(self) -> None:
+        """Create the checkpoint indexes once per process"""
+        if self._is_setup:
+            return
+
+        await self.checkpoint_collection.create_index(
+            [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1)],
+            unique=True,
+        )
+        await self.writes_collection.create_index(
+            [
+                ("thread_id", 1),
+                ("checkpoint_ns", 1),
+                ("checkpoint_id", -1),
+                ("task_id", 1),
+                ("idx", 1),
+            ],
+            unique=True,
+        )
+        if self.ttl:
+            for collection in (self.checkpoint_collection, self.writes_collection):
+                await collection.create_index(
+                    [("created_at", ASCENDING)],
+                    expireAfterSeconds=self.ttl,
+                )
+
+        self._is_setup = True
+
+    async def _load_pending_writes(self, config_values: dict) -> list:
+        cursor = self.writes_collection.find(config_values)
+        return [
+            (
+                doc["task_id"],
+                doc["channel"],
+                self.serde.loads_typed((doc["type"], doc["value"])),
+            )
+            async for doc in cursor
+        ]
+
+    def _to_tuple(self, doc: dict, pending_writes: list) -> CheckpointTuple:
+        config_values = {
+            "thread_id": doc["thread_id"],
+            "checkpoint_ns": doc["checkpoint_ns"],
+            "checkpoint_id": doc["checkpoint_id"],
+        }
+        return CheckpointTuple(
+            config={"configurable": config_values},
+            checkpoint=self.serde.loads_typed((doc["type"], doc["checkpoint"])),
+            metadata=loads_metadata(self.serde, doc["metadata"]),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": doc["thread_id"],
+                        "checkpoint_ns": doc["checkpoint_ns"],
+                        "checkpoint_id": doc["parent_checkpoint_id"],
+                    }
+                }
+                if doc.get("parent_checkpoint_id")
+                else None
+            ),
+            pending_writes=pending_writes,
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        await self.setup()
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+        if checkpoint_id := get_checkpoint_id(config):
+            query["checkpoint_id"] = checkpoint_id
+
+        doc = await self.checkpoint_collection.find_one(query, sort=[("checkpoint_id", -1)])
+        if doc is None:
+            return None
+
+        pending_writes = await self._load_pending_writes({
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": doc["checkpoint_id"],
+        })
+        return self._to_tuple(doc, pending_writes)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        await self.setup()
+
+        query = {}
+        if config is not None:
+            if "thread_id" in config["configurable"]:
+                query["thread_id"] = config["configurable"]["thread_id"]
+            if "checkpoint_ns" in config["configurable"]:
+                query["checkpoint_ns"] = config["configurable"]["checkpoint_ns"]
+
+        if filter:
+            for key, value in filter.items():
+                query[f"metadata.{key}"] = dumps_metadata(self.serde, value)
+
+        if before is not None:
+            query["checkpoint_id"] = {"$lt": before["configurable"]["checkpoint_id"]}
+
+        cursor = self.checkpoint_collection.find(
+            query, limit=0 if limit is None else limit, sort=[("checkpoint_id", -1)]
+        )
+        async for doc in cursor:
+            pending_writes = await self._load_pending_writes({
+                "thread_id": doc["thread_id"],
+                "checkpoint_ns": doc["checkpoint_ns"],
+                "checkpoint_id": doc["checkpoint_id"],
+            })
+            yield self._to_tuple(doc, pending_writes)
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        await self.setup()
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint_id = checkpoint["id"]
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        metadata = metadata.copy()
+        metadata.update(config.get("metadata", {}))
+        doc = {
+            "parent_checkpoint_id": config["configurable"].get("checkpoint_id"),
+            "type": type_,
+            "checkpoint": serialized_checkpoint,
+            "metadata": dumps_metadata(self.serde, metadata),
+        }
+        if self.ttl:
+            doc["created_at"] = datetime.now()
+
+        await self.checkpoint_collection.update_one(
+            {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            },
+            {"$set": doc},
+            upsert=True,
+        )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        if not writes:
+            return
+        await self.setup()
+
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Allow replacement on existing writes only if there were errors.
+        set_method = "$set" if all(w[0] in WRITES_IDX_MAP for w in writes) else "$setOnInsert"
+        now = datetime.now()
+
+        operations = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized_value = self.serde.dumps_typed(value)
+            update_doc = {
+                "channel": channel,
+                "type": type_,
+                "value": serialized_value,
+            }
+            if self.ttl:
+                update_doc["created_at"] = now
+
+            operations.append(
+                UpdateOne(
+                    {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": checkpoint_id,
+                        "task_id": task_id,
+                        "task_path": task_path,
+                        "idx": WRITES_IDX_MAP.get(channel, idx),
+                    },
+                    {set_method: update_doc},
+                    upsert=True,
+                )
+            )
+        await self.writes_collection.bulk_write(operations, ordered=False)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.checkpoint_collection.delete_many({"thread_id": thread_id})
+        await self.writes_collection.delete_many({"thread_id": thread_id})
@@ -1,23 +1,21 @@
-from langgraph.checkpoint.mongodb import MongoDBSaver
-from pymongo import MongoClient
-
 from langchain_openai import ChatOpenAI
 from langchain.agents import create_agent
 
-from config import MONGO_URI, OPENROUTER_API_KEY, OPENROUTER_API_HOST
+from config import OPENROUTER_API_KEY, OPENROUTER_API_HOST
+from database import get_db
 from tools import rag_search_tool, internet_search_tool, summarize_conversation, youtube_video_to_into_text_provider
+from .async_mongo_saver import AsyncMongoDBSaver
 
-mongo_client = MongoClient(MONGO_URI)
-
-checkpointer = MongoDBSaver(
-    mongo_client,
-    db_name="chat",
-    collection_name="langgraph_checkpoints"
+# Async checkpointer on the shared Motor pool, checkpoint I/O never blocks the loop
+checkpointer = AsyncMongoDBSaver(
+    get_db(),
+    checkpoint_collection_name="langgraph_checkpoints",
+    writes_collection_name="langgraph_checkpoint_writes",
 )
 
 tools = [rag_search_tool, internet_search_tool, summarize_conversation, youtube_video_to_into_text_provider]
 
-__system_prompt = """Sen yardımsever bir AI asistansın. 
+DEFAULT_SYSTEM_PROMPT = """Sen yardımsever bir AI asistansın. 
 Görevlerin:
 1. Kullanıcının sorularına doğru ve yardımcı yanıtlar ver
 2. Teknik sorular için search_knowledge_base aracını kullan
@@ -34,13 +32,12 @@ Kurallar:
 """
 
 
-def create_agent_executor(
-    model_name: str = "openai/gpt-oss-120b",
-    system_prompt: str = __system_prompt
-):
-    """Create LangGraph ReAct agent with MongoDB checkpointer"""
+CHAT_MODEL = "openai/gpt-5-mini"
+
 
-    llm = ChatOpenAI(
+def create_chat_llm(model_name: str) -> ChatOpenAI:
+    """Streaming chat model on OpenRouter"""
+    return ChatOpenAI(
         # model="openai/gpt-4.1-mini",
         model=model_name,
         temperature=0.7,
@@ -50,10 +47,24 @@ def create_agent_executor(
     )
 
 
+def create_agent_executor(
+    model_name: str = "openai/gpt-oss-120b",
+    system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+    agent_tools: list = None,
+    llm: ChatOpenAI = None,
+):
+    """Create LangGraph ReAct agent with MongoDB checkpointer
+
+    Prefer `ai_base.get_agent`, which caches the compiled agent per
+    (model, system prompt, tool set) instead of rebuilding it per request.
+    """
+
+    llm = llm or create_chat_llm(model_name)
+
     # LangGraph ReAct Agent with checkpointer
     agent = create_agent(
         model=llm,
-        tools=tools,
+        tools=agent_tools if agent_tools is not None else tools,
         system_prompt=system_prompt,
         checkpointer=checkpointer,  # Global checkpointer
         name="chat_agent"
@@ -12,4 +12,100 @@ DEFAULT_MODEL = config.get('DEFAULT_MODEL')
 BUCKET_ENDPOINT_URL=config.get('BUCKET_ENDPOINT_URL')
 BUCKET_ACCESS_KEY=config.get('BUCKET_ACCESS_KEY')
 BUCKET_SECRET_KEY=config.get('BUCKET_SECRET_KEY')
-BUCKET_NAME=config.get('BUCKET_NAME')
\ No newline at end of file
+BUCKET_NAME=config.get('BUCKET_NAME')
+
+AGENT_CACHE_SIZE = int(config.get('AGENT_CACHE_SIZE') or 16)
+
+# SSE token coalescing: one frame per window (ms) or byte budget, 0 disables
+SSE_FLUSH_INTERVAL_MS = int(config.get('SSE_FLUSH_INTERVAL_MS') or 30)
+SSE_FLUSH_BYTES = int(config.get('SSE_FLUSH_BYTES') or 2048)
+
+# Write-behind chat history persistence
+HISTORY_FLUSH_INTERVAL_MS = int(config.get('HISTORY_FLUSH_INTERVAL_MS') or 250)
+HISTORY_FLUSH_BATCH = int(config.get('HISTORY_FLUSH_BATCH') or 100)
+
+PRESIGNED_URL_CACHE_SIZE = int(config.get('PRESIGNED_URL_CACHE_SIZE') or 10000)
+
+MONGO_MIN_POOL_SIZE = int(config.get('MONGO_MIN_POOL_SIZE') or 5)
+MONGO_MAX_POOL_SIZE = int(config.get('MONGO_MAX_POOL_SIZE') or 100)
+
+# Startup/shutdown steps that take longer are logged and skipped
+LIFECYCLE_STEP_TIMEOUT_SECONDS = float(config.get('LIFECYCLE_STEP_TIMEOUT_SECONDS') or 30)
+
+# Resumable chat streams: frames kept per run and how long finished runs stay resumable
+CHAT_RUN_BUFFER_FRAMES = int(config.get('CHAT_RUN_BUFFER_FRAMES') or 512)
+CHAT_RUN_RETENTION_SECONDS = int(config.get('CHAT_RUN_RETENTION_SECONDS') or 60)
+CHAT_RUN_DISCONNECT_GRACE_SECONDS = float(config.get('CHAT_RUN_DISCONNECT_GRACE_SECONDS') or 15)
+
+# Chat admission control: concurrent runs per model ("model=n,model2=m" overrides the default)
+CHAT_MAX_CONCURRENCY = int(config.get('CHAT_MAX_CONCURRENCY') or 8)
+CHAT_MODEL_CONCURRENCY = config.get('CHAT_MODEL_CONCURRENCY') or ''
+CHAT_QUEUE_SIZE = int(config.get('CHAT_QUEUE_SIZE') or 32)
+CHAT_QUEUE_TIMEOUT_SECONDS = float(config.get('CHAT_QUEUE_TIMEOUT_SECONDS') or 30)
+
+# Embedding batches in flight at once on the async path
+EMBED_MAX_CONCURRENCY = int(config.get('EMBED_MAX_CONCURRENCY') or 4)
+
+# Content-addressed embedding cache (local sqlite, optional Mongo second tier)
+EMBED_CACHE_ENABLED = (config.get('EMBED_CACHE_ENABLED') or 'true').lower() == 'true'
+EMBED_CACHE_PATH = config.get('EMBED_CACHE_PATH') or '.cache/embeddings.sqlite3'
+EMBED_CACHE_MAX_ENTRIES = int(config.get('EMBED_CACHE_MAX_ENTRIES') or 200000)
+EMBED_CACHE_DTYPE = config.get('EMBED_CACHE_DTYPE') or 'float32'
+EMBED_CACHE_MONGO = (config.get('EMBED_CACHE_MONGO') or 'false').lower() == 'true'
+
+# In-process cache of search query embeddings
+QUERY_CACHE_SIZE = int(config.get('QUERY_CACHE_SIZE') or 1024)
+QUERY_CACHE_TTL_SECONDS = int(config.get('QUERY_CACHE_TTL_SECONDS') or 3600)
+
+# Embedding request packing: token budget and item cap per request
+EMBED_BATCH_MAX_TOKENS = int(config.get('EMBED_BATCH_MAX_TOKENS') or 16000)
+EMBED_BATCH_MAX_ITEMS = int(config.get('EMBED_BATCH_MAX_ITEMS') or 64)
+
+# Qdrant vector storage: dimension (also requested from the embedding model when
+# EMBED_DIMENSIONS is set), quantization ("none", "scalar", "binary") and search rescoring
+EMBED_DIMENSIONS = int(config.get('EMBED_DIMENSIONS') or 0) or None
+QDRANT_VECTOR_DIM = int(config.get('QDRANT_VECTOR_DIM') or EMBED_DIMENSIONS or 3072)
+QDRANT_QUANTIZATION = (config.get('QDRANT_QUANTIZATION') or 'scalar').lower()
+# Quantized collections keep only the compact copy in RAM; originals (for rescoring) go to disk
+QDRANT_ON_DISK = (config.get('QDRANT_ON_DISK') or ('false' if QDRANT_QUANTIZATION == 'none' else 'true')).lower() == 'true'
+# Convert an existing collection to the settings above at startup (otherwise differences are only reported)
+QDRANT_MIGRATE_STORAGE = (config.get('QDRANT_MIGRATE_STORAGE') or 'false').lower() == 'true'
+QDRANT_OVERSAMPLING = float(config.get('QDRANT_OVERSAMPLING') or 2.0)
+QDRANT_RESCORE = (config.get('QDRANT_RESCORE') or 'true').lower() == 'true'
+# Points per scroll request when paging through a source
+QDRANT_SCROLL_PAGE_SIZE = int(config.get('QDRANT_SCROLL_PAGE_SIZE') or 1000)
+
+# Connection pool sizes of the shared clients
+QDRANT_POOL_SIZE = int(config.get('QDRANT_POOL_SIZE') or 16)
+# gRPC transport for Qdrant calls. The port defaults to the bundled docker-compose.yml,
+# which publishes Qdrant's gRPC port 6334 on the host as 201 (HTTP 6333 as 200)
+QDRANT_PREFER_GRPC = (config.get('QDRANT_PREFER_GRPC') or 'false').lower() == 'true'
+QDRANT_GRPC_PORT = int(config.get('QDRANT_GRPC_PORT') or 201)
+# Bulk upsert: points per request and requests in flight
+QDRANT_BULK_BATCH_SIZE = int(config.get('QDRANT_BULK_BATCH_SIZE') or 512)
+QDRANT_BULK_PARALLEL = int(config.get('QDRANT_BULK_PARALLEL') or 4)
+# HNSW indexing threshold (KB of unindexed vectors, 0 = never index); bulk loads pause
+# indexing and restore this value. Leases of crashed loads expire after QDRANT_BULK_LEASE_SECONDS
+QDRANT_INDEXING_THRESHOLD = int(config.get('QDRANT_INDEXING_THRESHOLD') or 20000)
+QDRANT_BULK_LEASE_SECONDS = int(config.get('QDRANT_BULK_LEASE_SECONDS') or 600)
+# PDFs with at least this many pages are ingested as a bulk load
+INGEST_BULK_MIN_PAGES = int(config.get('INGEST_BULK_MIN_PAGES') or 200)
+OPENROUTER_POOL_SIZE = int(config.get('OPENROUTER_POOL_SIZE') or 32)
+
+# Embedding backend: "openrouter" (remote), "fastembed" (local ONNX) or "hashing" (deterministic, no model)
+EMBED_PROVIDER = (config.get('EMBED_PROVIDER') or 'openrouter').lower()
+FASTEMBED_MODEL = config.get('FASTEMBED_MODEL') or 'BAAI/bge-small-en-v1.5'
+
+# Staged PDF ingestion: extraction processes, pages per extraction task,
+# queue bound between stages, chunks per embedding call and concurrent embedders
+PDF_EXTRACT_WORKERS = int(config.get('PDF_EXTRACT_WORKERS') or 2)
+PDF_PAGES_PER_TASK = int(config.get('PDF_PAGES_PER_TASK') or 8)
+INGEST_QUEUE_SIZE = int(config.get('INGEST_QUEUE_SIZE') or 64)
+INGEST_EMBED_BATCH = int(config.get('INGEST_EMBED_BATCH') or 256)
+INGEST_EMBED_WORKERS = int(config.get('INGEST_EMBED_WORKERS') or 2)
+INGEST_UPSERT_BATCH = int(config.get('INGEST_UPSERT_BATCH') or 256)
+
+# Background ingestion jobs: concurrent jobs, queued job limit and how long finished jobs stay visible
+INGEST_JOB_WORKERS = int(config.get('INGEST_JOB_WORKERS') or 2)
+INGEST_JOB_QUEUE_SIZE = int(config.get('INGEST_JOB_QUEUE_SIZE') or 50)
+INGEST_JOB_RETENTION_SECONDS = int(config.get('INGEST_JOB_RETENTION_SECONDS') or 3600)
@@ -0,0 +1,40 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from config import MONGO_URI, MONGO_MIN_POOL_SIZE, MONGO_MAX_POOL_SIZE
+
+# Shared Motor client: routers, the LangGraph checkpointer and background
+# writers all use this single connection pool.
+client = AsyncIOMotorClient(
+    MONGO_URI,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+)
+db = client['chat']
+
+
+def get_db():
+    """Return the shared async `chat` database"""
+    return db
+
+
+async def ensure_indexes() -> None:
+    """Create the indexes the chat routes rely on (idempotent)"""
+    # Chat list of /ai/chats
+    await db['chats'].create_index(
+        [("user_id", 1), ("created_at", -1)],
+        name="user_created_at",
+    )
+    # Keyset pagination of /ai/chat/{chat_id}/history
+    await db['chat_histories'].create_index(
+        [("SessionId", 1), ("created_at", 1), ("_id", 1)],
+        name="session_created_at",
+    )
+
+
+async def ping() -> None:
+    """Open the first pooled connection before traffic arrives"""
+    await client.admin.command("ping")
+
+
+def close() -> None:
+    client.close()
@@ -0,0 +1,83 @@
+import asyncio
+
+import database
+from config import LIFECYCLE_STEP_TIMEOUT_SECONDS
+from ai_base import agent_registry, CHAT_MODEL
+from ai_base.base_ai_agent import checkpointer
+from services import get_history_writer, get_embedding_cache, shutdown_pdf_pool, ingestion_jobs
+from services import get_rag_service, close_services, EmbeddingMismatchError, chat_runs
+
+
+async def _step(name: str, coro, fatal: tuple = (), timeout: float = LIFECYCLE_STEP_TIMEOUT_SECONDS) -> None:
+    """Run a lifecycle step; failures are logged and skipped unless listed in `fatal`
+
+    A step running longer than `timeout` is cancelled and skipped, so an
+    unreachable dependency can't hang startup or shutdown. Steps run in a
+    thread can't be interrupted; they are abandoned, not stopped.
+    """
+    try:
+        await asyncio.wait_for(coro, timeout)
+    except fatal:
+        raise
+    except asyncio.TimeoutError:
+        print(f"Lifecycle step '{name}' skipped: timed out after {timeout}s")
+    except Exception as e:
+        print(f"Lifecycle step '{name}' skipped:", e)
+
+
+async def _ensure_storage_config(rag_service) -> None:
+    # An unexpired bulk-load lease means another worker is still loading
+    bulk_load_active = await rag_service.async_vector_db.bulk_load_active()
+    await asyncio.to_thread(rag_service.vector_db.ensure_storage_config, bulk_load_active)
+
+
+def _close_embedding_cache() -> None:
+    cache = get_embedding_cache()
+    if cache is not None:
+        cache.close()
+
+
+async def startup() -> None:
+    """Create indexes and warm every connection pool before serving traffic"""
+    # Builds the shared Qdrant, embedding and LLM clients before the first request
+    rag_service = await asyncio.to_thread(get_rag_service)
+    vector_db = rag_service.vector_db
+    ingestor = rag_service.ingestor
+
+    # Mongo: indexes on chats, chat_histories and the LangGraph checkpoints
+    await _step("mongo ping", database.ping())
+    await _step("mongo indexes", database.ensure_indexes())
+    # Before the indexes: `setup` would otherwise create the new, empty collections
+    await _step("checkpoint collections migration", checkpointer.migrate_legacy_collections())
+    await _step("checkpoint indexes", checkpointer.setup())
+
+    # Qdrant: payload indexes double as the connection warm-up
+    await _step("qdrant payload indexes", asyncio.to_thread(vector_db.ensure_payload_indexes))
+    # Vectors from another embedding model: refuse to start rather than return garbage
+    await _step("qdrant storage config", _ensure_storage_config(rag_service), fatal=(EmbeddingMismatchError,))
+    await _step("document registry backfill", rag_service.backfill_registry())
+
+    # OpenRouter: compiled default agent plus TLS handshakes for chat and embeddings
+    await asyncio.gather(
+        _step("chat agent warmup", agent_registry.warmup(CHAT_MODEL)),
+        _step("embedding provider warmup", asyncio.to_thread(ingestor.provider.warmup)),
+    )
+
+    get_history_writer().start()
+    ingestion_jobs.start()
+
+
+async def shutdown() -> None:
+    """Flush pending writes, then close pools in reverse order"""
+    # Every close is its own step: one failing must not leave the rest open
+    # Detached chat runs write their partial answers, so they go before the writer
+    await _step("chat runs close", chat_runs.aclose())
+    # Durable flush of queued chat history before the process exits
+    await _step("history writer stop", get_history_writer().stop())
+    await _step("ingestion jobs stop", ingestion_jobs.stop())
+
+    await _step("agent clients close", agent_registry.aclose())
+    await _step("pdf pool shutdown", asyncio.to_thread(shutdown_pdf_pool))
+    await _step("rag services close", close_services())
+    await _step("embedding cache close", asyncio.to_thread(_close_embedding_cache))
+    await _step("mongo close", asyncio.to_thread(database.close))
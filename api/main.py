@@ -1,22 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-# from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager
 
 from routers import audio_router, search_router, embed_router, ai_router
+import lifecycle
+
 
-'''
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await lifecycle.startup()
     try:
-        ...
-    except Exception as e:
-        print("Startup skipped:", e)
-    yield
-'''
-
-# app = FastAPI(lifespan=lifespan)
-app = FastAPI()
+        yield
+    finally:
+        await lifecycle.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -1,15 +1,17 @@
-from fastapi import APIRouter, HTTPException, Form, UploadFile, File
+import asyncio
+from fastapi import APIRouter, HTTPException, Form, UploadFile, File, Query, Header, Request
 from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
-from motor.motor_asyncio import AsyncIOMotorClient
 from typing import Optional, List, Annotated
 from models import MessageRequest, CreateChatRequest, MergeAudioRequest
-import json
 from datetime import datetime
-from services import RAGService, CustomMongoHistory
+from services import CustomMongoHistory, get_history_writer, chat_runs
+from services import chat_scheduler, QueueFull, QueueTimeout
 from bson import ObjectId
 from langchain_core.messages import ToolMessage
-from ai_base import base_ai_agent
+from ai_base import get_agent, DEFAULT_SYSTEM_PROMPT, CHAT_MODEL
+from database import get_db
+from utils import encode_cursor, decode_cursor
 
 # Config
 from config import MONGO_URI, OPENROUTER_API_KEY, OPENROUTER_API_HOST, DEFAULT_MODEL
@@ -17,11 +19,11 @@ from config import MONGO_URI, OPENROUTER_API_KEY, OPENROUTER_API_HOST, DEFAULT_M
 from ai_base import generate_chat_title
 
 # MongoDB Setup
-client = AsyncIOMotorClient(MONGO_URI)
-db = client['chat']
+db = get_db()
 
 chats_collection = db['chats']
 history_collection = db['chat_histories']
+history_writer = get_history_writer()
 
 router = APIRouter(
     prefix="/ai",
@@ -38,11 +40,9 @@ def get_session_history(session_id: str) -> CustomMongoHistory:
 
     )
 
-rag_service = RAGService()
-
-
 @router.post('/chat/{chat_id}')
 async def send_message_streaming(
+        request: Request,
         chat_id: str,
         question: str = Form(...),
         file: Optional[UploadFile] = File(None),
@@ -51,18 +51,46 @@ async def send_message_streaming(
 ):
     """Streaming response endpoint with memory"""
 
-    async def generate():
+    # One run per chat: a second one would race the first on the same LangGraph thread
+    active = chat_runs.get_active(chat_id)
+    if active is not None:
+        raise HTTPException(
+            status_code=409,
+            detail="A response is already being generated for this chat, resume it from /stream",
+            headers={"X-Run-Id": active.run_id}
+        )
+
+    # Admission control: reject right away when the model's queue is full
+    try:
+        ticket = chat_scheduler.reserve(CHAT_MODEL)
+    except QueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    async def agent_events():
         chat_message = ''  # AI yanıtını toplamak için
         chat_used = None
 
+        # Sıradaysa pozisyonu bildir, slot açılana kadar bekle
+        try:
+            async for position in ticket.wait():
+                yield {'type': 'queued', 'position': position}
+        except QueueTimeout as e:
+            yield {'type': 'error', 'message': str(e), 'retry_after': e.retry_after}
+            return
+
         try:
-            agent_executor = base_ai_agent(
-                model_name='openai/gpt-5-mini'
+            agent_executor = get_agent(
+                model_name=CHAT_MODEL,
+                system_prompt=f"{DEFAULT_SYSTEM_PROMPT}\n\n{custom_prompt}" if custom_prompt else None
             )
 
             user_input = question
 
-            await history_collection.insert_one({
+            history_writer.add_message({
                 'SessionId': chat_id,
                 'role': 'user',
                 'content': user_input,
@@ -74,9 +102,6 @@ async def send_message_streaming(
 
             messages = [("user", user_input)]
 
-            if custom_prompt:
-                messages.append(("system", custom_prompt))
-
             config = {
                 "configurable": {
                     "thread_id": chat_id
@@ -95,13 +120,13 @@ async def send_message_streaming(
                     content = event["data"]["chunk"].content
                     if content:
                         chat_message += content
-                        yield f"data: {json.dumps({'type': 'token', 'content': content}, ensure_ascii=False)}\n\n"
+                        yield {'type': 'token', 'content': content}
 
                 elif kind == "on_tool_start":
                     tool_name = event["name"]
                     tool_input = event["data"]["input"]
                     print(f'Tool başladı: {tool_name}', tool_input)
-                    yield f"data: {json.dumps({'type': 'tool_start', 'tool': tool_name, 'input': tool_input}, ensure_ascii=False)}\n\n"
+                    yield {'type': 'tool_start', 'tool': tool_name, 'input': tool_input}
 
                 elif kind == "on_tool_end":
                     tool_name = event["name"]
@@ -116,7 +141,7 @@ async def send_message_streaming(
                     else:
                         payload = tool_output
 
-                    yield f"data: {json.dumps({'type': 'tool_end', 'content': payload, 'tool': tool_name}, ensure_ascii=False)}\n\n"
+                    yield {'type': 'tool_end', 'content': payload, 'tool': tool_name}
 
                 elif kind == "on_chat_model_end":
                     output = event.get("data", {}).get("output")
@@ -125,10 +150,11 @@ async def send_message_streaming(
                         token_usage = output.usage_metadata
                         chat_used = token_usage
 
-                        yield f"data: {json.dumps({'type': 'token_usage', 'data': token_usage}, ensure_ascii=False)}\n\n"
+                        yield {'type': 'token_usage', 'data': token_usage}
 
+            # Write-behind: persisted in the background, `done` does not wait on storage
             if chat_message:
-                await history_collection.insert_one({
+                history_writer.add_message({
                     'SessionId': chat_id,
                     'role': 'ai',
                     'content': chat_message.strip(),
@@ -136,19 +162,29 @@ async def send_message_streaming(
                     'used': chat_used
                 })
 
-                print(f"AI mesajı kaydedildi (uzunluk: {len(chat_message)}): {chat_message[:100]}...")
+                print(f"AI mesajı kuyruğa alındı (uzunluk: {len(chat_message)}): {chat_message[:100]}...")
 
             # Chat metadata güncelle
-            await chats_collection.update_one(
-                {"_id": ObjectId(chat_id)},
-                {
-                    "$set": {"updated_at": datetime.utcnow()},
-                    "$inc": {"message_count": 2}
-                }
-            )
+            history_writer.touch_chat(chat_id, message_count=2)
 
             # İşlem tamamlandı sinyali
-            yield f"data: {json.dumps({'type': 'done', 'metadata': chat_used}, ensure_ascii=False)}\n\n"
+            yield {'type': 'done', 'metadata': chat_used}
+
+        except (asyncio.CancelledError, GeneratorExit):
+            # Run cancelled or the framer closed us: keep what was generated so far, flagged as cancelled
+            if chat_message:
+                history_writer.add_message({
+                    'SessionId': chat_id,
+                    'role': 'ai',
+                    'content': chat_message.strip(),
+                    'created_at': datetime.utcnow(),
+                    'used': chat_used,
+                    'cancelled': True
+                })
+                history_writer.touch_chat(chat_id, message_count=2)
+            else:
+                history_writer.touch_chat(chat_id, message_count=1)
+            raise
 
         except Exception as e:
             import traceback
@@ -157,26 +193,58 @@ async def send_message_streaming(
 
             # Hata durumunda bile mesajı kaydetmeyi dene
             if chat_message:
-                try:
-                    await history_collection.insert_one({
-                        'SessionId': chat_id,
-                        'role': 'ai',
-                        'content': chat_message.strip(),
-                        'created_at': datetime.utcnow(),
-                        'error': True
-                    })
-                except:
-                    pass
-
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)}, ensure_ascii=False)}\n\n"
+                history_writer.add_message({
+                    'SessionId': chat_id,
+                    'role': 'ai',
+                    'content': chat_message.strip(),
+                    'created_at': datetime.utcnow(),
+                    'error': True
+                })
+
+            yield {'type': 'error', 'message': str(e)}
+
+        finally:
+            ticket.release()
+
+    # The run lives on in the background so a dropped client can resume it
+    run = chat_runs.start(chat_id, agent_events())
+    return _sse_response(run.subscribe(is_disconnected=request.is_disconnected), run)
+
+
+@router.get('/chat/{chat_id}/stream')
+async def resume_message_streaming(
+        request: Request,
+        chat_id: str,
+        last_event_id: Optional[str] = Header(None),
+        from_event_id: Optional[str] = None,
+):
+    """Resume a chat stream after a disconnect
+
+    Replays the frames after `Last-Event-ID` (or `from_event_id` for clients
+    that cannot set headers) and then follows the run until it is done.
+    """
+    run, last_seq = chat_runs.resolve(chat_id, last_event_id or from_event_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="No resumable stream for this chat")
+
+    return _sse_response(run.subscribe(last_seq, is_disconnected=request.is_disconnected), run)
+
+
+@router.get('/metrics/scheduler')
+async def get_scheduler_metrics():
+    """Per-model concurrency, queue depth and wait times of chat runs"""
+    return JSONResponse(content={"models": chat_scheduler.metrics()})
+
 
+def _sse_response(frames, run) -> StreamingResponse:
     return StreamingResponse(
-        generate(),
+        frames,
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
-            "X-Accel-Buffering": "no"
+            "X-Accel-Buffering": "no",
+            "X-Run-Id": run.run_id,
         }
     )
 
@@ -219,39 +287,92 @@ async def create_chat(request: CreateChatRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat oluşturma hatası: {str(e)}")
 
-from s3_handler import S3Handler
+from s3_handler import get_s3_handler
 
 
 @router.get("/chat/{chat_id}/history")
-async def get_history(chat_id: str, limit: int = 50):
+async def get_history(
+        chat_id: str,
+        limit: int = Query(50, ge=1, le=500),
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        fields: Optional[str] = None,
+):
+    """Keyset-paginated chat history, oldest first within a page
+
+    Without a cursor the latest page is returned. `before` pages back to older
+    messages, `after` pages forward to newer ones. `fields` is a comma separated
+    projection, `_id` and `created_at` are always included.
+    """
     try:
-        s3 = S3Handler()
+        if before and after:
+            raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
+
+        query = {"SessionId": chat_id}
+        direction = -1
+        try:
+            if after:
+                created_at, object_id = decode_cursor(after)
+                direction = 1
+                query["$or"] = [
+                    {"created_at": {"$gt": created_at}},
+                    {"created_at": created_at, "_id": {"$gt": object_id}},
+                ]
+            elif before:
+                created_at, object_id = decode_cursor(before)
+                query["$or"] = [
+                    {"created_at": {"$lt": created_at}},
+                    {"created_at": created_at, "_id": {"$lt": object_id}},
+                ]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        projection = None
+        if fields:
+            projection = {f.strip(): 1 for f in fields.split(",") if f.strip()}
+            projection["created_at"] = 1
 
+        # Served by the (SessionId, created_at, _id) index, one page read per request
         cursor = (
             history_collection
-            .find({"SessionId": chat_id})
-            .sort("created_at", 1)
-            .limit(limit)
+            .find(query, projection)
+            .sort([("created_at", direction), ("_id", direction)])
+            .limit(limit + 1)
         )
-        history = await cursor.to_list(length=limit)
+        history = await cursor.to_list(length=limit + 1)
+        has_more = len(history) > limit
+        history = history[:limit]
+        if direction == -1:
+            history.reverse()
+
+        s3 = get_s3_handler()
         for msg in history:
+            msg["cursor"] = encode_cursor(msg["created_at"], msg["_id"])
             msg["_id"] = str(msg["_id"])
             msg["created_at"] = msg["created_at"].isoformat()
 
             if msg.get('attachments', {}).get("audio", None):
-                msg["attachments"]["audio"] = s3.generate_presigned_url(msg["attachments"]["audio"], 3600)
+                msg["attachments"]["audio"] = s3.get_presigned_url(msg["attachments"]["audio"], 3600)
 
             if msg.get('attachments', {}).get("images", None):
                 msg["attachments"]["images"] = [
-                    s3.generate_presigned_url(image, 3600)
+                    s3.get_presigned_url(image, 3600)
                     for image in msg["attachments"]["images"]
                 ]
 
         return {
             "chat_id": chat_id,
-            "history": history
+            "history": history,
+            "cursors": {
+                "before": history[0]["cursor"] if history else None,
+                "after": history[-1]["cursor"] if history else None,
+            },
+            "has_more_before": has_more if direction == -1 else bool(after),
+            "has_more_after": has_more if direction == 1 else bool(before),
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -285,7 +406,7 @@ async def get_user_chats(user_id: str, limit: int = 100):
     try:
         cursor = (
             chats_collection
-            .find({"user_id": user_id})
+            .find({"user_id": user_id}, {"applied_flushes": 0})
             .sort("created_at", -1)
             .limit(limit)
         )
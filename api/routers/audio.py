@@ -56,7 +56,7 @@ async def create_audio(payload: CreateAudioModel):
     s3 = get_s3_handler()
     s3.upload_file(s3_key=s3_key, content_type="audio/wav", file_content=audio.read())
 
-    ref = s3.generate_presigned_url(s3_key=s3_key, expiration=3600)
+    ref = s3.get_presigned_url(s3_key=s3_key, expiration=3600)
 
     return {
         "audio_s3_key": s3_key,
@@ -1,18 +1,26 @@
 # routes/embed.py
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+import asyncio
+import shutil
+import tempfile
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Annotated, Optional
 
-from services import RAGService
+from services import RAGService, get_rag_service, get_embedding_cache, query_embedding_cache
+from services import ingestion_jobs, JobQueueFull
+from services.rag_service import DocumentProcessor
+from utils import encode_event
 
 router = APIRouter(
     prefix="/embed",
     tags=["embed"]
 )
 
-# Initialize RAG Service
-rag_service = RAGService()
+# Shared RAG service from the process-wide registry
+RAGServiceDep = Annotated[RAGService, Depends(get_rag_service)]
 
 
 # ============= Request Models =============
@@ -32,20 +40,46 @@ class QuestionWithFileRequest(BaseModel):
 # ============= Endpoints =============
 
 @router.post("/load-document")
-async def load_document(file: UploadFile = File(...), save_to_db: bool = True):
+async def load_document(
+        rag_service: RAGServiceDep,
+        file: UploadFile = File(...),
+        save_to_db: bool = True,
+        background: bool = True,
+):
     """
     Load document and proces
 
     - save_to_db=True: Save to Qdrant -permanently
     - save_to_db=False: Just proces -Temporarily
+    - background=True: Queue an ingestion job and return its id (202),
+      follow it on /embed/jobs/{job_id} or /embed/jobs/{job_id}/events
     """
+    suffix = Path(file.filename).suffix.lower()
+    if suffix not in DocumentProcessor.SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {suffix}")
+
+    if save_to_db and background:
+        # Spool the upload to disk instead of holding it in memory
+        path = await asyncio.to_thread(_spool_upload, file, suffix)
+        try:
+            job = ingestion_jobs.submit(file.filename, path, rag_service.aprocess_file)
+        except JobQueueFull as e:
+            Path(path).unlink(missing_ok=True)
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
+        return JSONResponse(status_code=202, content={
+            **job.snapshot(),
+            "status_url": f"{router.prefix}/jobs/{job.job_id}",
+            "events_url": f"{router.prefix}/jobs/{job.job_id}/events",
+        })
+
     try:
         content = await file.read()
 
         if save_to_db:
-            result = rag_service.process_and_store(content, file.filename)
+            result = await rag_service.aprocess_and_store(content, file.filename)
         else:
-            result = rag_service.process_only(content, file.filename)
+            result = await rag_service.aprocess_only(content, file.filename)
 
         return JSONResponse(content=result)
 
@@ -60,8 +94,51 @@ async def load_document(file: UploadFile = File(...), save_to_db: bool = True):
         raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
 
 
+def _spool_upload(file: UploadFile, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        shutil.copyfileobj(file.file, tmp, length=1 << 20)
+        return tmp.name
+
+
+@router.get("/jobs")
+async def list_jobs():
+    return JSONResponse(content={"jobs": ingestion_jobs.snapshots()})
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status and progress (pages, chunks, ETA) of an ingestion job"""
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JSONResponse(content=job.snapshot())
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """SSE stream of job snapshots, ends once the job succeeded or failed"""
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def frames():
+        async for snapshot in job.watch():
+            yield encode_event({"type": "done" if job.done else "progress", **snapshot})
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
 @router.post("/ask-with-file")
 async def ask_with_file(
+        rag_service: RAGServiceDep,
         file: UploadFile = File(...),
         question: str = Form(...),
         top_k: int = Form(3)
@@ -75,7 +152,7 @@ async def ask_with_file(
     try:
         content = await file.read()
 
-        result = rag_service.ask_with_temporary_file(
+        result = await rag_service.aask_with_temporary_file(
             question=question,
             content=content,
             filename=file.filename,
@@ -91,9 +168,10 @@ async def ask_with_file(
 
 
 @router.get("/list-files")
-async def list_files():
+async def list_files(rag_service: RAGServiceDep):
+    """Stored documents with chunk counts, read from the document registry"""
     try:
-        files = rag_service.list_stored_files()
+        files = await rag_service.list_stored_files()
         return JSONResponse(content={
             "files": files,
             # "total": len(files)
@@ -103,14 +181,14 @@ async def list_files():
         raise HTTPException(status_code=500, detail=f"Error listing files: {str(e)}")
 
 @router.get("/search")
-async def search(q: str, file_name: Optional[str] = None):
+async def search(rag_service: RAGServiceDep, q: str, file_name: Optional[str] = None):
     if q is not None and len(q) < 2:
         raise HTTPException(
             status_code=400,
             detail=f"Search term '{q}' is too short"
         )
     try:
-        results = rag_service.search_in_database(
+        results = await rag_service.asearch_in_database(
             query=q,
             filename=file_name
         )
@@ -123,9 +201,25 @@ async def search(q: str, file_name: Optional[str] = None):
 
 
 @router.delete("/remove-file")
-async def remove_file(payload: DocumentRemoveRequest):
-    rag_service.vector_db.delete_by_source(payload.filename)
+async def remove_file(payload: DocumentRemoveRequest, rag_service: RAGServiceDep):
+    deleted = await rag_service.remove_document(payload.filename)
     return {
         "status": "deleted",
-        "filename": payload.filename
-    }
\ No newline at end of file
+        "filename": payload.filename,
+        "deleted_points": deleted,
+    }
+
+@router.get("/cache/stats")
+async def embedding_cache_stats():
+    """Hit/miss counters and size of the embedding caches"""
+    cache = get_embedding_cache()
+    return JSONResponse(content={
+        "embeddings": {"enabled": True, **cache.stats()} if cache is not None else {"enabled": False},
+        "queries": query_embedding_cache.stats(),
+    })
+
+
+@router.get("/batcher/stats")
+async def embedding_batcher_stats(rag_service: RAGServiceDep):
+    """Packing, shrink and latency stats of embedding requests"""
+    return JSONResponse(content=rag_service.ingestor.batcher.stats())
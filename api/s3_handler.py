@@ -1,11 +1,18 @@
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
+from functools import lru_cache
+from threading import Lock
 from urllib.parse import quote
 from typing import Optional, Dict, List
 from botocore.exceptions import ClientError
 from botocore.client import Config as BotocoreConfig
 import boto3
 
-from config import BUCKET_NAME, BUCKET_SECRET_KEY, BUCKET_ACCESS_KEY, BUCKET_ENDPOINT_URL
+from config import (
+    BUCKET_NAME, BUCKET_SECRET_KEY, BUCKET_ACCESS_KEY, BUCKET_ENDPOINT_URL,
+    PRESIGNED_URL_CACHE_SIZE
+)
 
 
 class S3Handler:
@@ -37,6 +44,12 @@ class S3Handler:
             use_ssl=False,
             config=botocore_config
         )
+
+        # (s3_key, expiration, expiry bucket) -> presigned url
+        self._presigned_cache = OrderedDict()
+        self._presigned_cache_size = PRESIGNED_URL_CACHE_SIZE
+        self._presigned_lock = Lock()
+
     def upload_file(
             self,
             file_content: bytes,
@@ -152,6 +165,37 @@ class S3Handler:
             print(f"Presigned URL error: {e}")
             return None
 
+    def get_presigned_url(
+            self,
+            s3_key: str,
+            expiration: int = 3600
+    ) -> Optional[str]:
+        """
+        Cached presigned URL for file access
+
+        Time is split into buckets of 3/4 of `expiration`; the first request in
+        a bucket signs the URL and later ones reuse it. A returned URL is always
+        valid for at least a quarter of `expiration`.
+        """
+        window = max(1, expiration - max(60, expiration // 4))
+        key = (s3_key, expiration, int(time.time() // window))
+
+        with self._presigned_lock:
+            url = self._presigned_cache.get(key)
+            if url is not None:
+                self._presigned_cache.move_to_end(key)
+                return url
+
+        url = self.generate_presigned_url(s3_key, expiration)
+        if url is None:
+            return None
+
+        with self._presigned_lock:
+            self._presigned_cache[key] = url
+            while len(self._presigned_cache) > self._presigned_cache_size:
+                self._presigned_cache.popitem(last=False)
+        return url
+
     def copy_file(self, source_key: str, dest_key: str) -> bool:
         """
         Copy file within S3
@@ -202,9 +246,10 @@ class S3Handler:
             return False
 
 
+@lru_cache(maxsize=1)
 def get_s3_handler() -> S3Handler:
     """
-    Get S3 handler instance
+    Get the process-wide S3 handler (one boto3 client and presigned URL cache)
     """
     return S3Handler()
 
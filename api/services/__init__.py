@@ -1,18 +1,70 @@
 from .audio_transcriber import AudioTranscriber
 from .srt_parser import SRTParser
 from .youtube_downloader import YTDLManager
+from .embedding_cache import EmbeddingCache, get_embedding_cache, QueryEmbeddingCache, query_embedding_cache
+from .embedding_batcher import AdaptiveBatcher
+from .embedding_providers import (
+    EmbeddingProvider,
+    OpenRouterEmbeddingProvider,
+    FastEmbedProvider,
+    HashingEmbeddingProvider,
+    get_embedding_provider,
+)
 from .vector_service import MultiSourceIngestor
-from .qdrant_storage import QdrantStorage
+from .qdrant_storage import QdrantStorage, AsyncQdrantStorage, EmbeddingMismatchError
+from .vector_index import InMemoryVectorIndex
+from .document_manifest import ChunkIdAssigner, DocumentManifestStore, content_hash, file_content_hash
+from .ingestion_pipeline import PdfIngestionPipeline, shutdown_pdf_pool
+from .ingestion_jobs import IngestionJob, IngestionJobManager, JobQueueFull, ingestion_jobs
 from .rag_service import RAGService
+from .registry import get_rag_service, get_vector_db, close_services
 from .custom_mongo_history_service import CustomMongoHistory
+from .history_writer import HistoryWriteBehind, get_history_writer
+from .chat_runs import ChatRun, ChatRunRegistry, chat_runs
+from .chat_scheduler import ChatScheduler, QueueFull, QueueTimeout, chat_scheduler
 
 
 __all__ = [
     "AudioTranscriber",
     "SRTParser",
     "YTDLManager",
+    "EmbeddingCache",
+    "get_embedding_cache",
+    "QueryEmbeddingCache",
+    "query_embedding_cache",
+    "AdaptiveBatcher",
+    "EmbeddingProvider",
+    "OpenRouterEmbeddingProvider",
+    "FastEmbedProvider",
+    "HashingEmbeddingProvider",
+    "get_embedding_provider",
     "MultiSourceIngestor",
     "QdrantStorage",
+    "AsyncQdrantStorage",
+    "EmbeddingMismatchError",
+    "InMemoryVectorIndex",
+    "ChunkIdAssigner",
+    "DocumentManifestStore",
+    "content_hash",
+    "file_content_hash",
+    "PdfIngestionPipeline",
+    "shutdown_pdf_pool",
+    "IngestionJob",
+    "IngestionJobManager",
+    "JobQueueFull",
+    "ingestion_jobs",
     "RAGService",
+    "get_rag_service",
+    "get_vector_db",
+    "close_services",
     "CustomMongoHistory",
+    "HistoryWriteBehind",
+    "get_history_writer",
+    "ChatRun",
+    "ChatRunRegistry",
+    "chat_runs",
+    "ChatScheduler",
+    "QueueFull",
+    "QueueTimeout",
+    "chat_scheduler",
 ]
\ No newline at end of file
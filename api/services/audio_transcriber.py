@@ -1,4 +1,5 @@
 import base64
+import threading
 import time
 import wave
 from pathlib import Path
@@ -8,6 +9,10 @@ from openai import APIError
 from config import OPENROUTER_API_KEY, OPENROUTER_API_HOST, STT_MODEL
 
 
+class TranscriptionCancelled(Exception):
+    """Raised when a transcription is cancelled between chunks"""
+
+
 class AudioTranscriber:
     def __init__(self, auto_split: bool = True, max_chunk_size_mb: float = 9.5):
         """
@@ -250,10 +255,13 @@ class AudioTranscriber:
     def transcribe(
             self,
             audio_path: Path,
-            prompt: str = "Please transcribe this audio file accurately. Only return the transcription, no additional comments."
+            prompt: str = "Please transcribe this audio file accurately. Only return the transcription, no additional comments.",
+            cancel_event: threading.Event = None
     ):
         """
         Ses dosyasını transkrip eder. Gerekirse otomatik olarak boyuta göre böler.
+
+        cancel_event set edilirse parçalar arasında durur (istemci bağlantısı koptuğunda).
         """
         audio_path = Path(audio_path)
         temp_files = []
@@ -286,6 +294,9 @@ class AudioTranscriber:
                 # Her parçayı transkrip et
                 full_transcription = []
                 for i, chunk_path in enumerate(chunks, 1):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise TranscriptionCancelled(f"Transkripsiyon iptal edildi ({i - 1}/{len(chunks)} parça)")
+
                     chunk_size = self.__get_file_size_mb(chunk_path)
                     print(f"🎙️ Parça {i}/{len(chunks)} transkrip ediliyor ({chunk_size:.2f}MB)...")
 
@@ -0,0 +1,219 @@
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from config import CHAT_RUN_BUFFER_FRAMES, CHAT_RUN_RETENTION_SECONDS, CHAT_RUN_DISCONNECT_GRACE_SECONDS
+from utils import SSEFramer, encode_event
+
+
+class ChatRun:
+    """A single agent run whose SSE frames outlive the HTTP connection.
+
+    Frames are numbered and kept in a bounded ring buffer so a client can
+    reconnect with `Last-Event-ID` and resume. A subscriber whose position
+    falls behind the buffer (a reconnect, or a live reader too slow to keep
+    up) first gets a `resync` event: a snapshot of the answer text, tool
+    events and token usage up to the oldest buffered frame, which replaces
+    what the client has rendered so far.
+
+    When the last subscriber goes away the run is cancelled after
+    `disconnect_grace` seconds unless a client reconnects in the meantime.
+    """
+
+    # How often an idle subscriber checks whether its client is still there
+    DISCONNECT_POLL_SECONDS = 1.0
+
+    def __init__(
+        self,
+        chat_id: str,
+        buffer_size: int = CHAT_RUN_BUFFER_FRAMES,
+        disconnect_grace: float = CHAT_RUN_DISCONNECT_GRACE_SECONDS,
+    ):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.chat_id = chat_id
+        self.frames = deque(maxlen=buffer_size)  # (seq, payload, frame)
+        self.seq = 0
+        self.finished = False
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.cancelled = False
+        self.disconnect_grace = disconnect_grace
+        self.subscribers = 0
+        self._cancel_handle: Optional[asyncio.TimerHandle] = None
+        # Snapshot of everything evicted from the buffer, sent in `resync`
+        self._evicted_text = []
+        self._evicted_tools = []
+        self._evicted_usage = None
+        self._changed = asyncio.Condition()
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.run_id}:{seq}"
+
+    async def publish(self, payload: dict) -> None:
+        async with self._changed:
+            self.seq += 1
+            if len(self.frames) == self.frames.maxlen:
+                _, evicted, _ = self.frames[0]
+                kind = evicted.get("type")
+                if kind == "token":
+                    self._evicted_text.append(evicted["content"])
+                elif kind in ("tool_start", "tool_end"):
+                    self._evicted_tools.append(evicted)
+                elif kind == "token_usage":
+                    self._evicted_usage = evicted.get("data")
+            self.frames.append((self.seq, payload, encode_event(payload, self.event_id(self.seq))))
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        async with self._changed:
+            self.finished = True
+            self.finished_at = time.monotonic()
+            self._changed.notify_all()
+
+    def cancel(self) -> None:
+        """Cancel the agent run, its in-flight tool calls and LLM requests"""
+        if self.task is not None and not self.task.done():
+            self.cancelled = True
+            self.task.cancel()
+
+    def _attach(self) -> None:
+        self.subscribers += 1
+        if self._cancel_handle is not None:
+            self._cancel_handle.cancel()
+            self._cancel_handle = None
+
+    def _detach(self) -> None:
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.finished:
+            self._cancel_handle = asyncio.get_running_loop().call_later(
+                self.disconnect_grace, self.cancel
+            )
+
+    async def subscribe(
+            self,
+            last_seq: int = 0,
+            is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> AsyncIterator[bytes]:
+        """Replay frames after `last_seq`, then follow the live run"""
+        self._attach()
+        try:
+            while True:
+                async with self._changed:
+                    try:
+                        await asyncio.wait_for(
+                            self._changed.wait_for(lambda: self.seq > last_seq or self.finished),
+                            timeout=self.DISCONNECT_POLL_SECONDS if is_disconnected else None,
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+
+                    oldest = self.frames[0][0] if self.frames else self.seq + 1
+                    resync = None
+                    if last_seq + 1 < oldest:
+                        # Frames between our position and the buffer are gone
+                        resync = encode_event(
+                            {
+                                "type": "resync",
+                                "content": "".join(self._evicted_text),
+                                "tools": list(self._evicted_tools),
+                                "used": self._evicted_usage,
+                            },
+                            self.event_id(oldest - 1),
+                        )
+                        last_seq = oldest - 1
+                    pending = [(seq, frame) for seq, _, frame in self.frames if seq > last_seq]
+                    finished = self.finished
+
+                if not pending and not finished:
+                    # Idle (e.g. a long tool call): make sure someone is still listening
+                    if is_disconnected is not None and await is_disconnected():
+                        return
+                    continue
+
+                if resync is not None:
+                    yield resync
+                for seq, frame in pending:
+                    yield frame
+                    last_seq = seq
+
+                if finished and last_seq >= self.seq:
+                    return
+        finally:
+            self._detach()
+
+
+class ChatRunRegistry:
+    """Active and recently finished chat runs, addressable for resume"""
+
+    def __init__(self, retention_seconds: int = CHAT_RUN_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._runs: Dict[str, ChatRun] = {}
+        self._by_chat: Dict[str, str] = {}
+
+    def start(self, chat_id: str, payloads: AsyncIterator[dict]) -> ChatRun:
+        """Run the payload producer in the background, detached from any request"""
+        run = ChatRun(chat_id)
+        self._runs[run.run_id] = run
+        self._by_chat[chat_id] = run.run_id
+        run.task = asyncio.create_task(self._drive(run, payloads), name=f"chat-run-{run.run_id}")
+        return run
+
+    async def _drive(self, run: ChatRun, payloads: AsyncIterator[dict]) -> None:
+        frames = SSEFramer().coalesce(payloads)
+        try:
+            async for payload in frames:
+                await run.publish(payload)
+        except asyncio.CancelledError:
+            print(f"Chat run {run.run_id} cancelled (client gone or shutting down)")
+        finally:
+            # Closing the framer cancels the producer so it can save its partial answer
+            await frames.aclose()
+            if run.cancelled:
+                await run.publish({"type": "cancelled"})
+            await run.finish()
+            asyncio.get_running_loop().call_later(self.retention_seconds, self._forget, run)
+
+    def _forget(self, run: ChatRun) -> None:
+        self._runs.pop(run.run_id, None)
+        if self._by_chat.get(run.chat_id) == run.run_id:
+            del self._by_chat[run.chat_id]
+
+    def resolve(self, chat_id: str, last_event_id: Optional[str]) -> Tuple[Optional[ChatRun], int]:
+        """Find the run and sequence number a reconnecting client resumes from"""
+        run_id, last_seq = None, 0
+        if last_event_id:
+            run_id, _, seq = last_event_id.partition(":")
+            last_seq = int(seq) if seq.isdigit() else 0
+
+        run = self._runs.get(run_id) if run_id else None
+        if run is None:
+            run = self._runs.get(self._by_chat.get(chat_id, ""))
+            if run is not None and run.run_id != run_id:
+                last_seq = 0
+
+        if run is None or run.chat_id != chat_id:
+            return None, 0
+        return run, last_seq
+
+    def get_active(self, chat_id: str) -> Optional[ChatRun]:
+        run = self._runs.get(self._by_chat.get(chat_id, ""))
+        if run is None or run.finished:
+            return None
+        return run
+
+    async def aclose(self) -> None:
+        """Cancel the runs still going and wait until they saved their partial answers"""
+        tasks = []
+        for run in self._runs.values():
+            if run.task is not None and not run.task.done():
+                run.cancel()
+                tasks.append(run.task)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+chat_runs = ChatRunRegistry()
+
+
+__all__ = ["ChatRun", "ChatRunRegistry", "chat_runs"]
@@ -0,0 +1,231 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, Optional
+
+from config import (
+    CHAT_MAX_CONCURRENCY,
+    CHAT_MODEL_CONCURRENCY,
+    CHAT_QUEUE_SIZE,
+    CHAT_QUEUE_TIMEOUT_SECONDS,
+)
+
+
+class QueueFull(Exception):
+    """The wait queue of a model is full; retry after `retry_after` seconds"""
+
+    def __init__(self, model_name: str, retry_after: int):
+        super().__init__(f"Chat queue for {model_name} is full")
+        self.retry_after = retry_after
+
+
+class QueueTimeout(Exception):
+    """A queued run did not get a slot within the queue timeout"""
+
+    def __init__(self, model_name: str, retry_after: int):
+        super().__init__(f"Timed out waiting for a free {model_name} slot")
+        self.retry_after = retry_after
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    """Parse "model=n,model2=m" into a dict"""
+    limits = {}
+    for item in spec.split(','):
+        name, _, value = item.strip().rpartition('=')
+        if name and value.isdigit():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class Ticket:
+    """A reservation in a model lane; waits for a slot, then holds it until released"""
+
+    def __init__(self, lane: "_ModelLane"):
+        self.lane = lane
+        self.granted = False
+        self.released = False
+        self.enqueued_at = time.monotonic()
+        self.granted_at: Optional[float] = None
+        self._changed = asyncio.Event()
+
+    async def wait(self, timeout: float = CHAT_QUEUE_TIMEOUT_SECONDS) -> AsyncIterator[int]:
+        """Yield the 1-based queue position whenever it changes until a slot is granted
+
+        Raises QueueTimeout if no slot frees up within `timeout` seconds. If the
+        caller stops iterating early (e.g. the run is cancelled) the ticket is
+        released.
+        """
+        admitted = False
+        deadline = self.enqueued_at + timeout
+        last_position = None
+        try:
+            while not self.granted:
+                position = self.lane.position(self)
+                if position != last_position:
+                    last_position = position
+                    yield position
+                    continue
+
+                self._changed.clear()
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    await asyncio.wait_for(self._changed.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    if not self.granted:
+                        self.lane.timed_out += 1
+                        raise QueueTimeout(self.lane.model_name, self.lane.retry_after())
+            admitted = True
+        finally:
+            if not admitted:
+                self.release()
+
+    def release(self) -> None:
+        """Free the slot, or leave the queue if no slot was granted yet (idempotent)"""
+        if self.released:
+            return
+        self.released = True
+        self.lane.release(self)
+
+
+class _ModelLane:
+    """Concurrency slots and FIFO wait queue of a single model"""
+
+    # Samples kept for the wait / run time percentiles
+    SAMPLE_SIZE = 1024
+
+    def __init__(self, model_name: str, limit: int, queue_size: int):
+        self.model_name = model_name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self.waiters = deque()
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_times = deque(maxlen=self.SAMPLE_SIZE)
+        self.run_times = deque(maxlen=self.SAMPLE_SIZE)
+
+    def reserve(self) -> Ticket:
+        ticket = Ticket(self)
+        if self.active < self.limit and not self.waiters:
+            self._grant(ticket)
+            return ticket
+
+        if len(self.waiters) >= self.queue_size:
+            self.rejected += 1
+            raise QueueFull(self.model_name, self.retry_after())
+
+        self.waiters.append(ticket)
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        try:
+            return self.waiters.index(ticket) + 1
+        except ValueError:
+            return 0
+
+    def release(self, ticket: Ticket) -> None:
+        if not ticket.granted:
+            # Left the queue before getting a slot: everyone behind moves up
+            try:
+                self.waiters.remove(ticket)
+            except ValueError:
+                return
+            self._notify_waiters()
+            return
+
+        self.active -= 1
+        self.run_times.append(time.monotonic() - ticket.granted_at)
+        while self.waiters and self.active < self.limit:
+            self._grant(self.waiters.popleft())
+        self._notify_waiters()
+
+    def _grant(self, ticket: Ticket) -> None:
+        ticket.granted = True
+        ticket.granted_at = time.monotonic()
+        self.active += 1
+        self.admitted += 1
+        self.wait_times.append(ticket.granted_at - ticket.enqueued_at)
+        ticket._changed.set()
+
+    def _notify_waiters(self) -> None:
+        for waiter in self.waiters:
+            waiter._changed.set()
+
+    def retry_after(self) -> int:
+        """Rough seconds until a slot frees up for a new request"""
+        if not self.run_times:
+            return 5
+        avg_run = sum(self.run_times) / len(self.run_times)
+        estimate = avg_run * (len(self.waiters) + 1) / max(self.limit, 1)
+        return max(1, min(120, math.ceil(estimate)))
+
+    @staticmethod
+    def _percentile(samples, q: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def metrics(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_seconds": {
+                "avg": round(sum(self.wait_times) / len(self.wait_times), 3) if self.wait_times else 0.0,
+                "p50": round(self._percentile(self.wait_times, 0.5), 3),
+                "p95": round(self._percentile(self.wait_times, 0.95), 3),
+                "max": round(max(self.wait_times), 3) if self.wait_times else 0.0,
+            },
+            "run_seconds_avg": round(sum(self.run_times) / len(self.run_times), 3) if self.run_times else 0.0,
+        }
+
+
+class ChatScheduler:
+    """Admission control in front of the chat agent.
+
+    Each model gets `limit` concurrent runs and a bounded FIFO wait queue.
+    `reserve()` rejects immediately with `QueueFull` when the queue is full,
+    so the route can answer 429 with Retry-After instead of piling up work
+    that would slow every stream down.
+    """
+
+    def __init__(
+        self,
+        default_limit: int = CHAT_MAX_CONCURRENCY,
+        queue_size: int = CHAT_QUEUE_SIZE,
+        model_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.default_limit = default_limit
+        self.queue_size = queue_size
+        self.model_limits = model_limits if model_limits is not None else _parse_limits(CHAT_MODEL_CONCURRENCY)
+        self._lanes: Dict[str, _ModelLane] = {}
+
+    def _lane(self, model_name: str) -> _ModelLane:
+        lane = self._lanes.get(model_name)
+        if lane is None:
+            limit = self.model_limits.get(model_name, self.default_limit)
+            lane = self._lanes[model_name] = _ModelLane(model_name, limit, self.queue_size)
+        return lane
+
+    def reserve(self, model_name: str) -> Ticket:
+        """Take a slot or a place in the queue; raises QueueFull"""
+        return self._lane(model_name).reserve()
+
+    def metrics(self) -> dict:
+        return {name: lane.metrics() for name, lane in self._lanes.items()}
+
+
+chat_scheduler = ChatScheduler()
+
+
+__all__ = ["ChatScheduler", "Ticket", "QueueFull", "QueueTimeout", "chat_scheduler"]
@@ -0,0 +1,127 @@
+import hashlib
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from database import get_db
+
+# Namespace for deterministic Qdrant point ids
+POINT_NAMESPACE = uuid.UUID("5b0c7a52-3f7e-4d2a-9d55-8c1f2e6a4b10")
+
+
+def content_hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_content_hash(path: str) -> str:
+    """sha256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ChunkIdAssigner:
+    """Deterministic point ids from (source, page, chunk hash, occurrence).
+
+    The same chunk on the same page of the same document always gets the same
+    id, so re-uploads overwrite instead of duplicating. Identical chunks on one
+    page are told apart by their occurrence number. Call it in document order.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self._occurrences: Dict[Tuple[Optional[int], str], int] = {}
+
+    def __call__(self, page: Optional[int], text: str) -> str:
+        digest = content_hash(text)
+        occurrence = self._occurrences.get((page, digest), 0)
+        self._occurrences[(page, digest)] = occurrence + 1
+        return str(uuid.uuid5(POINT_NAMESPACE, f"{self.source}\0{page}\0{digest}\0{occurrence}"))
+
+
+class DocumentManifestStore:
+    """Per-document manifest of the Qdrant points it was indexed as.
+
+    A re-upload compares its chunk ids against the manifest: known ids are
+    neither embedded nor upserted again, and ids that vanished are deleted.
+    The manifests double as the document registry: they are written on every
+    ingest and removed with the document, so listing files reads one small
+    Mongo document per source instead of touching Qdrant.
+    """
+
+    # Registry fields returned by `list_documents`, point ids stay out
+    LISTING = {"chunk_count": 1, "pages": 1, "size_bytes": 1, "created_at": 1, "updated_at": 1}
+
+    def __init__(self, db=None):
+        self.collection = (db if db is not None else get_db())['document_manifests']
+
+    async def get(self, source: str) -> Optional[dict]:
+        return await self.collection.find_one({"_id": source})
+
+    async def save(
+            self,
+            source: str,
+            file_hash: str,
+            point_ids: List[str],
+            pages: Optional[int] = None,
+            size_bytes: Optional[int] = None,
+    ) -> None:
+        await self.collection.update_one(
+            {"_id": source},
+            {
+                "$set": {
+                    "content_hash": file_hash,
+                    "point_ids": point_ids,
+                    "chunk_count": len(point_ids),
+                    "pages": pages,
+                    "size_bytes": size_bytes,
+                    "updated_at": datetime.utcnow(),
+                },
+                "$setOnInsert": {"created_at": datetime.utcnow()},
+            },
+            upsert=True,
+        )
+
+    async def delete(self, source: str) -> None:
+        await self.collection.delete_one({"_id": source})
+
+    async def list_documents(self) -> List[dict]:
+        """Registered documents with chunk counts and ingest times, by name"""
+        cursor = self.collection.find({}, self.LISTING).sort("_id", 1)
+        return [
+            {
+                "filename": doc["_id"],
+                "document_count": doc.get("chunk_count", 0),
+                "pages": doc.get("pages"),
+                "size_bytes": doc.get("size_bytes"),
+                "created_at": doc["created_at"].isoformat() if doc.get("created_at") else None,
+                "ingested_at": doc["updated_at"].isoformat() if doc.get("updated_at") else None,
+            }
+            async for doc in cursor
+        ]
+
+    async def backfill(self, counts: Dict[str, int]) -> int:
+        """Register sources indexed before the registry existed
+
+        Entries get only a chunk count; without point ids the next upload
+        of such a document treats all of its points as stale.
+        """
+        if not counts:
+            return 0
+        known = set(await self.collection.distinct("_id", {"_id": {"$in": list(counts)}}))
+        now = datetime.utcnow()
+        missing = [
+            {"_id": source, "chunk_count": count, "created_at": now, "updated_at": now}
+            for source, count in counts.items()
+            if source not in known
+        ]
+        if missing:
+            await self.collection.insert_many(missing, ordered=False)
+        return len(missing)
+
+
+__all__ = ["ChunkIdAssigner", "DocumentManifestStore", "content_hash", "file_content_hash"]
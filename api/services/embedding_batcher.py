@@ -0,0 +1,150 @@
+import threading
+from collections import deque
+from typing import Iterator, List
+
+from openai import APIStatusError
+
+from config import EMBED_BATCH_MAX_TOKENS, EMBED_BATCH_MAX_ITEMS
+
+try:
+    import tiktoken
+except ImportError:  # installed with langchain-openai, but keep the heuristic as fallback
+    tiktoken = None
+
+
+# Error messages that mean "this request was too big", not "try again"
+_SIZE_ERROR_MARKERS = (
+    "maximum context length",
+    "too many tokens",
+    "too large",
+    "too long",
+    "max_tokens",
+    "token limit",
+)
+
+
+class AdaptiveBatcher:
+    """Packs texts into embedding requests by token budget and item cap.
+
+    After a size-related error the limits are halved so the following
+    batches fit; they grow back to the configured values after
+    `recover_after` successful batches in a row. Every request is recorded
+    for latency and packing stats.
+    """
+
+    # Latency samples kept for the stats
+    SAMPLE_SIZE = 512
+
+    def __init__(
+        self,
+        max_tokens: int = EMBED_BATCH_MAX_TOKENS,
+        max_items: int = EMBED_BATCH_MAX_ITEMS,
+        recover_after: int = 20,
+    ):
+        self.configured_tokens = max_tokens
+        self.configured_items = max_items
+        self.max_tokens = max_tokens
+        self.max_items = max_items
+        self.recover_after = recover_after
+
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:  # encoding files are downloaded on first use
+                print(f"Embedding batcher: tiktoken unavailable, estimating tokens: {e}")
+
+        self._lock = threading.Lock()
+        self._streak = 0
+        self.batches = 0
+        self.items = 0
+        self.tokens = 0  # counted when planned, under the lock
+        self.failures = 0
+        self.shrinks = 0
+        self.latencies = deque(maxlen=self.SAMPLE_SIZE)
+
+    def count_tokens(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return len(text) // 4 + 1
+
+    def plan(self, texts: List[str]) -> Iterator[List[str]]:
+        """Split texts, in order, into batches within the current limits
+
+        A single text above the token budget still gets a batch of its own.
+        Batches are cut as they are consumed, so a shrink() mid-run applies
+        to the batches still to come.
+        """
+        batch, batch_tokens = [], 0
+        for text in texts:
+            tokens = self.count_tokens(text)
+            if batch and (batch_tokens + tokens > self.max_tokens or len(batch) >= self.max_items):
+                self._count(batch_tokens)
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            self._count(batch_tokens)
+            yield batch
+
+    def _count(self, tokens: int) -> None:
+        with self._lock:
+            self.tokens += tokens
+
+    @staticmethod
+    def is_size_error(error: Exception) -> bool:
+        if not isinstance(error, APIStatusError):
+            return False
+        if error.status_code == 413:
+            return True
+        message = str(error).lower()
+        return error.status_code == 400 and any(m in message for m in _SIZE_ERROR_MARKERS)
+
+    def shrink(self) -> None:
+        with self._lock:
+            self.max_tokens = max(256, self.max_tokens // 2)
+            self.max_items = max(1, self.max_items // 2)
+            self._streak = 0
+            self.shrinks += 1
+            print(f"Embedding batcher: shrunk to {self.max_items} items / {self.max_tokens} tokens")
+
+    def record(self, batch: List[str], seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+            if not ok:
+                self.failures += 1
+                self._streak = 0
+                return
+
+            self.batches += 1
+            self.items += len(batch)
+            self._streak += 1
+            if self._streak >= self.recover_after and (
+                    self.max_tokens < self.configured_tokens or self.max_items < self.configured_items
+            ):
+                self.max_tokens = min(self.configured_tokens, self.max_tokens * 2)
+                self.max_items = min(self.configured_items, self.max_items * 2)
+                self._streak = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self.latencies)
+        return {
+            "max_tokens": self.max_tokens,
+            "max_items": self.max_items,
+            "batches": self.batches,
+            "failures": self.failures,
+            "shrinks": self.shrinks,
+            "avg_items_per_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "avg_tokens_per_batch": round(self.tokens / self.batches, 1) if self.batches else 0.0,
+            "latency_seconds": {
+                "avg": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+                "p50": round(latencies[len(latencies) // 2], 3) if latencies else 0.0,
+                "p95": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 3) if latencies else 0.0,
+            },
+            "tokenizer": "tiktoken" if self._encoding is not None else "estimate",
+        }
+
+
+__all__ = ["AdaptiveBatcher"]
@@ -0,0 +1,276 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+from pymongo import MongoClient, UpdateOne
+
+from config import (
+    MONGO_URI,
+    EMBED_CACHE_PATH,
+    EMBED_CACHE_MAX_ENTRIES,
+    EMBED_CACHE_DTYPE,
+    EMBED_CACHE_MONGO,
+    EMBED_CACHE_ENABLED,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL_SECONDS,
+)
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache.
+
+    Vectors are keyed by sha256(model, text) and stored as float32 or float16
+    blobs in a local sqlite file. Entries are evicted least recently used once
+    more than `max_entries` are stored. With `use_mongo` a shared
+    `embedding_cache` collection acts as a second tier: local misses are
+    looked up there and new vectors are written to both.
+
+    Methods are blocking; call them through `asyncio.to_thread` on the loop.
+    """
+
+    # Evict down to this fraction of max_entries so eviction is amortized
+    EVICT_TO = 0.9
+
+    def __init__(
+        self,
+        path: str = EMBED_CACHE_PATH,
+        max_entries: int = EMBED_CACHE_MAX_ENTRIES,
+        dtype: str = EMBED_CACHE_DTYPE,
+        use_mongo: bool = EMBED_CACHE_MONGO,
+    ):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+        self.mongo_hits = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, dtype TEXT NOT NULL, vector BLOB NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+        self._mongo = None
+        if use_mongo:
+            self._mongo = MongoClient(MONGO_URI)['chat']['embedding_cache']
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _encode(self, vector: Sequence[float]) -> bytes:
+        return np.asarray(vector, dtype=self.dtype).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes, dtype: str) -> List[float]:
+        return np.frombuffer(blob, dtype=dtype).astype(np.float32).tolist()
+
+    # -------- lookup --------
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached vectors in input order, None for misses"""
+        keys = [self.key(model, t) for t in texts]
+        found = {}
+
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            # Stay below sqlite's bound parameter limit
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                for key, dtype, blob in rows:
+                    found[key] = self._decode(blob, dtype)
+
+            if found:
+                now = time.time_ns()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+        if self._mongo is not None:
+            missing = [k for k in dict.fromkeys(keys) if k not in found]
+            if missing:
+                remote = self._get_remote(missing)
+                if remote:
+                    self.mongo_hits += len(remote)
+                    found.update(remote)
+                    self._put_local(list(remote.items()))
+
+        vectors = [found.get(k) for k in keys]
+        hits = sum(v is not None for v in vectors)
+        self.hits += hits
+        self.misses += len(vectors) - hits
+        return vectors
+
+    def _get_remote(self, keys: List[str]) -> dict:
+        try:
+            return {
+                doc["_id"]: self._decode(doc["vector"], doc["dtype"])
+                for doc in self._mongo.find({"_id": {"$in": keys}})
+            }
+        except Exception as e:
+            print(f"Embedding cache: Mongo lookup failed: {e}")
+            return {}
+
+    # -------- store --------
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        items = [(self.key(model, t), v) for t, v in zip(texts, vectors)]
+        self._put_local(items)
+
+        if self._mongo is not None and items:
+            try:
+                self._mongo.bulk_write(
+                    [
+                        UpdateOne(
+                            {"_id": key},
+                            {"$setOnInsert": {"dtype": self.dtype.name, "vector": self._encode(v)}},
+                            upsert=True,
+                        )
+                        for key, v in items
+                    ],
+                    ordered=False,
+                )
+            except Exception as e:
+                print(f"Embedding cache: Mongo write failed: {e}")
+
+    def _put_local(self, items) -> None:
+        now = time.time_ns()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dtype, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(key, self.dtype.name, self._encode(v), now) for key, v in items],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * self.EVICT_TO)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+
+    # -------- stats --------
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "bytes": size,
+            "dtype": self.dtype.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "mongo_hits": self.mongo_hits,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        if self._mongo is not None:
+            self._mongo.database.client.close()
+
+
+class QueryEmbeddingCache:
+    """In-process LRU/TTL cache of search query embeddings.
+
+    Keys are normalized queries (NFKC, case-folded, whitespace collapsed), so
+    "  What is RAG? " and "what is rag?" share one entry: the vector of
+    whichever form was embedded first. Sits in front of the persistent
+    cache: a hit costs a dict lookup, not a sqlite query.
+    """
+
+    def __init__(self, max_size: int = QUERY_CACHE_SIZE, ttl_seconds: int = QUERY_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (model, query) -> (expires_at, vector)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+    def get(self, model: str, query: str) -> Optional[List[float]]:
+        key = (model, self.normalize(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model: str, query: str, vector: List[float]) -> None:
+        key = (model, self.normalize(query))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide embedding cache, None when EMBED_CACHE_ENABLED is off"""
+    global _embedding_cache
+    if _embedding_cache is None and EMBED_CACHE_ENABLED:
+        _embedding_cache = EmbeddingCache()
+    return _embedding_cache
+
+
+query_embedding_cache = QueryEmbeddingCache()
+
+
+__all__ = ["EmbeddingCache", "get_embedding_cache", "QueryEmbeddingCache", "query_embedding_cache"]
@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+
+from config import (
+    OPENROUTER_API_HOST,
+    OPENROUTER_API_KEY,
+    BASE_EMBEDDING_MODEL,
+    EMBED_DIMENSIONS,
+    EMBED_PROVIDER,
+    FASTEMBED_MODEL,
+    QDRANT_VECTOR_DIM,
+    OPENROUTER_POOL_SIZE,
+)
+
+try:
+    from fastembed import TextEmbedding
+except ImportError:  # optional local ONNX backend
+    TextEmbedding = None
+
+
+class EmbeddingProvider(ABC):
+    """Backend that turns a batch of texts into vectors.
+
+    `MultiSourceIngestor` adds caching, batching, retries and concurrency on
+    top; a provider only has to embed one batch. `remote` providers are worth
+    batching and retrying, local ones run in a worker thread on the async path.
+    """
+
+    name = "base"
+    remote = False
+
+    def __init__(self, model: str, dimension: int):
+        self.model = model
+        self.dimension = dimension
+
+    @property
+    def model_key(self) -> str:
+        """Identifies the vector space; cache entries and collections are tagged with it"""
+        return f"{self.name}:{self.model}@{self.dimension}"
+
+    def tag(self) -> dict:
+        return {
+            "embedding_provider": self.name,
+            "embedding_model": self.model,
+            "embedding_dim": self.dimension,
+        }
+
+    @abstractmethod
+    def embed(self, batch: List[str]) -> List[List[float]]:
+        """Vectors for one batch, in input order"""
+
+    async def aembed(self, batch: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed, batch)
+
+    def warmup(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        self.close()
+
+
+class OpenRouterEmbeddingProvider(EmbeddingProvider):
+    """OpenAI-compatible embeddings API on OpenRouter"""
+
+    name = "openrouter"
+    remote = True
+
+    def __init__(self, model: str = BASE_EMBEDDING_MODEL, dimensions: Optional[int] = EMBED_DIMENSIONS):
+        # Without an explicit `dimensions` the model's native size must match the collection
+        super().__init__(model, dimensions or QDRANT_VECTOR_DIM)
+        self.dimensions = dimensions
+        limits = httpx.Limits(max_connections=OPENROUTER_POOL_SIZE, max_keepalive_connections=OPENROUTER_POOL_SIZE)
+        self.client = OpenAI(
+            base_url=OPENROUTER_API_HOST,
+            api_key=OPENROUTER_API_KEY,
+            timeout=60,
+            http_client=DefaultHttpxClient(limits=limits),
+        )
+        self.async_client = AsyncOpenAI(
+            base_url=OPENROUTER_API_HOST,
+            api_key=OPENROUTER_API_KEY,
+            timeout=60,
+            http_client=DefaultAsyncHttpxClient(limits=limits),
+        )
+
+    def _request(self, batch: List[str]) -> dict:
+        request = {
+            "model": self.model,
+            "input": batch,
+            "extra_headers": {
+                "HTTP-Referer": "farukseker.com.tr",
+                "X-Title": "farukseker",
+            },
+        }
+        # Truncated output size, for models that support it (text-embedding-3-*)
+        if self.dimensions:
+            request["dimensions"] = self.dimensions
+        return request
+
+    def embed(self, batch: List[str]) -> List[List[float]]:
+        res = self.client.embeddings.create(**self._request(batch))
+        return [d.embedding for d in res.data]
+
+    async def aembed(self, batch: List[str]) -> List[List[float]]:
+        res = await self.async_client.embeddings.create(**self._request(batch))
+        return [d.embedding for d in res.data]
+
+    def warmup(self) -> None:
+        self.client.models.list()
+
+    def close(self) -> None:
+        self.client.close()
+
+    async def aclose(self) -> None:
+        self.client.close()
+        await self.async_client.close()
+
+
+class FastEmbedProvider(EmbeddingProvider):
+    """Local ONNX embeddings through `fastembed` (optional dependency)"""
+
+    name = "fastembed"
+
+    def __init__(self, model: str = FASTEMBED_MODEL):
+        if TextEmbedding is None:
+            raise RuntimeError("EMBED_PROVIDER=fastembed requires the `fastembed` package")
+        self._model = TextEmbedding(model_name=model)
+        dimension = len(next(iter(self._model.embed(["dimension probe"]))))
+        super().__init__(model, dimension)
+
+    def embed(self, batch: List[str]) -> List[List[float]]:
+        return [vector.tolist() for vector in self._model.embed(batch)]
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Deterministic feature-hashing embedder: no model, no network.
+
+    Word unigrams and bigrams are hashed into signed buckets and the vector is
+    L2-normalized, so texts sharing words score higher. Good enough for tests,
+    offline benchmarks and lexical-ish retrieval, not a semantic model.
+    """
+
+    name = "hashing"
+    _token = re.compile(r"\w+", re.UNICODE)
+
+    def __init__(self, dimension: int = QDRANT_VECTOR_DIM):
+        super().__init__("hashing-v1", dimension)
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        words = self._token.findall(text.casefold())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, batch: List[str]) -> List[List[float]]:
+        return [self._vector(text).tolist() for text in batch]
+
+
+PROVIDERS = {
+    OpenRouterEmbeddingProvider.name: OpenRouterEmbeddingProvider,
+    FastEmbedProvider.name: FastEmbedProvider,
+    HashingEmbeddingProvider.name: HashingEmbeddingProvider,
+}
+
+
+@lru_cache(maxsize=None)
+def get_embedding_provider(name: str = EMBED_PROVIDER) -> EmbeddingProvider:
+    """Process-wide provider instance; all ingestors share its clients / model"""
+    try:
+        return PROVIDERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown embedding provider: {name} (expected one of {', '.join(PROVIDERS)})")
+
+
+__all__ = [
+    "EmbeddingProvider",
+    "OpenRouterEmbeddingProvider",
+    "FastEmbedProvider",
+    "HashingEmbeddingProvider",
+    "get_embedding_provider",
+]
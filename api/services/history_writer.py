@@ -0,0 +1,201 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from config import HISTORY_FLUSH_INTERVAL_MS, HISTORY_FLUSH_BATCH
+from database import get_db
+
+
+class HistoryWriteBehind:
+    """Write-behind persistence for chat messages and chat metadata.
+
+    Streaming requests enqueue their writes and return immediately; a single
+    background task flushes them with one `insert_many` on `chat_histories`
+    and one unordered `bulk_write` on `chats` per batch. A flush happens when
+    `max_batch` writes are pending or every `flush_interval` seconds, and
+    `stop()` drains everything that is still queued; writes after that are
+    rejected.
+
+    Chat updates carry a flush token that is recorded on the chat, so a
+    retried `$inc` of an update that was already applied (partial bulk
+    failure, timeout after the server committed) matches nothing instead
+    of counting twice.
+    """
+
+    # Flush tokens remembered per chat; only the last few can be retried
+    APPLIED_TOKENS_KEPT = 16
+
+    def __init__(
+        self,
+        db,
+        flush_interval_ms: int = HISTORY_FLUSH_INTERVAL_MS,
+        max_batch: int = HISTORY_FLUSH_BATCH,
+        max_retries: int = 3,
+    ):
+        self.history_collection = db['chat_histories']
+        self.chats_collection = db['chats']
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+
+        self._messages: List[dict] = []
+        # chat_id -> (message_count increment, latest updated_at)
+        self._chat_updates: Dict[ObjectId, list] = {}
+        # Failed (chat_id, token, increment, updated_at) updates, retried unchanged
+        self._chat_retries: List[tuple] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        self._closed = False
+
+    # -------- enqueue --------
+
+    def add_message(self, document: dict) -> None:
+        """Queue a `chat_histories` document for insertion"""
+        self._check_open()
+        document.setdefault('created_at', datetime.utcnow())
+        self._messages.append(document)
+        self._notify()
+
+    def touch_chat(self, chat_id: str, message_count: int = 0) -> None:
+        """Queue an `updated_at` / `message_count` update for a chat"""
+        self._check_open()
+        key = ObjectId(chat_id)
+        update = self._chat_updates.setdefault(key, [0, None])
+        update[0] += message_count
+        update[1] = datetime.utcnow()
+        self._notify()
+
+    @property
+    def pending(self) -> int:
+        return len(self._messages) + len(self._chat_updates) + len(self._chat_retries)
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise RuntimeError("History writer is stopped; the write would never be flushed")
+
+    def _notify(self) -> None:
+        if self._task is None and not self._stopping:
+            self.start()
+        if self.pending >= self.max_batch:
+            self._wake.set()
+
+    # -------- lifecycle --------
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._closed = False
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run(), name="history-write-behind")
+
+    async def stop(self) -> None:
+        """Stop the background task and durably flush what is left"""
+        self._stopping = True
+        if self._task is not None:
+            # Let an in-flight flush finish instead of cancelling it mid-write
+            self._wake.set()
+            await self._task
+            self._task = None
+
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        while self.pending:
+            if not await self.flush():
+                print(f"History writer: {self.pending} writes could not be persisted on shutdown")
+                break
+        self._closed = True
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self.pending:
+                await self.flush()
+
+    # -------- flushing --------
+
+    async def flush(self) -> bool:
+        """Write all pending documents; failed batches are re-queued"""
+        async with self._flush_lock:
+            messages, self._messages = self._messages, []
+            chat_updates, self._chat_updates = self._chat_updates, {}
+
+            ok = True
+            if messages and not await self._with_retry(lambda: self._insert_messages(messages)):
+                self._messages[:0] = messages
+                ok = False
+
+            # Retried updates keep their token; new ones get this flush's token
+            token = uuid.uuid4().hex
+            chat_ops, self._chat_retries = self._chat_retries + [
+                (chat_id, token, count, updated_at)
+                for chat_id, (count, updated_at) in chat_updates.items()
+            ], []
+
+            if chat_ops:
+                operations = [
+                    UpdateOne(
+                        {"_id": chat_id, "applied_flushes": {"$ne": op_token}},
+                        {
+                            "$max": {"updated_at": updated_at},
+                            "$inc": {"message_count": count},
+                            "$push": {"applied_flushes": {"$each": [op_token], "$slice": -self.APPLIED_TOKENS_KEPT}},
+                        }
+                    )
+                    for chat_id, op_token, count, updated_at in chat_ops
+                ]
+                if not await self._with_retry(
+                        lambda: self.chats_collection.bulk_write(operations, ordered=False)
+                ):
+                    self._chat_retries[:0] = chat_ops
+                    ok = False
+
+            return ok
+
+    async def _insert_messages(self, messages: List[dict]) -> None:
+        # insert_many assigns _id up front, so a retried batch may partially
+        # exist already; duplicate key errors mean "already persisted".
+        try:
+            await self.history_collection.insert_many(messages, ordered=False)
+        except BulkWriteError as e:
+            if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])):
+                raise
+            if e.details.get('writeConcernErrors'):
+                raise
+
+    async def _with_retry(self, operation) -> bool:
+        for attempt in range(self.max_retries):
+            try:
+                await operation()
+                return True
+            except Exception as e:
+                print(f"History writer flush failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(0.5 * (2 ** attempt))
+        return False
+
+
+_history_writer: Optional[HistoryWriteBehind] = None
+
+
+def get_history_writer() -> HistoryWriteBehind:
+    """Process-wide write-behind writer on the shared Motor database"""
+    global _history_writer
+    if _history_writer is None:
+        _history_writer = HistoryWriteBehind(get_db())
+    return _history_writer
+
+
+__all__ = ["HistoryWriteBehind", "get_history_writer"]
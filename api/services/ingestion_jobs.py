@@ -0,0 +1,199 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from config import INGEST_JOB_WORKERS, INGEST_JOB_QUEUE_SIZE, INGEST_JOB_RETENTION_SECONDS
+
+
+class JobQueueFull(Exception):
+    """Too many ingestion jobs are already waiting"""
+
+
+class IngestionJob:
+    """State and progress of one background document ingestion"""
+
+    def __init__(self, filename: str, path: str, process: Callable[..., Awaitable[dict]]):
+        self.job_id = uuid.uuid4().hex
+        self.filename = filename
+        self.path = path
+        self.process = process
+        self.status = "queued"
+        self.created_at = datetime.utcnow()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.progress = {
+            "pages_total": None,
+            "pages_done": 0,
+            "chunks_total": 0,
+            "chunks_embedded": 0,
+            "chunks_unchanged": 0,
+        }
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.version = 0
+        # Replaced on every change; watchers wait on the one they captured
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def update(self, **counters) -> None:
+        """Progress callback handed to the ingestion; runs on the event loop"""
+        self.progress.update(counters)
+        self._notify()
+
+    def set_status(self, status: str) -> None:
+        self.status = status
+        if status == "running":
+            self.started = time.monotonic()
+        elif self.done:
+            self.finished = time.monotonic()
+        self._notify()
+
+    def _notify(self) -> None:
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def fraction_done(self) -> Optional[float]:
+        """Share of the expected chunks that are stored, None until it can be estimated"""
+        if self.status == "succeeded":
+            return 1.0
+        p = self.progress
+        written = p["chunks_embedded"] + p["chunks_unchanged"]
+        if p["pages_total"]:
+            if not p["pages_done"]:
+                return 0.0
+            # Extrapolate the document's chunk count from the pages chunked so far
+            expected = p["chunks_total"] / p["pages_done"] * p["pages_total"]
+        else:
+            expected = p["chunks_total"]
+        return min(1.0, written / expected) if expected else None
+
+    def eta_seconds(self) -> Optional[float]:
+        fraction = self.fraction_done()
+        if self.status != "running" or not fraction:
+            return None
+        elapsed = time.monotonic() - self.started
+        return round(elapsed * (1 - fraction) / fraction, 1)
+
+    def snapshot(self) -> dict:
+        fraction = self.fraction_done()
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "elapsed_seconds": round((self.finished or time.monotonic()) - self.started, 1) if self.started else 0.0,
+            "progress": {
+                **self.progress,
+                "percent": round(fraction * 100, 1) if fraction is not None else None,
+                "eta_seconds": self.eta_seconds(),
+            },
+            "result": self.result,
+            "error": self.error,
+        }
+
+    async def watch(self, poll_seconds: float = 15.0) -> AsyncIterator[dict]:
+        """Yield a snapshot now and after every change until the job is done"""
+        seen = -1
+        while True:
+            changed = self._changed
+            if self.version != seen:
+                seen = self.version
+                yield self.snapshot()
+                if self.done:
+                    return
+                continue
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                # Keep-alive snapshot, e.g. while a large page range is extracted
+                seen = -1
+
+
+class IngestionJobManager:
+    """Bounded worker pool that runs document ingestions in the background.
+
+    Uploads are spooled to disk by the route and queued here; at most
+    `workers` ingestions run at once and at most `max_queued` wait. The spool
+    file is deleted when its job finishes. Finished jobs stay queryable for
+    `retention_seconds`.
+    """
+
+    def __init__(
+        self,
+        workers: int = INGEST_JOB_WORKERS,
+        max_queued: int = INGEST_JOB_QUEUE_SIZE,
+        retention_seconds: int = INGEST_JOB_RETENTION_SECONDS,
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"ingestion-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs that never ran leave their spool files behind otherwise
+        while self._queue is not None and not self._queue.empty():
+            Path(self._queue.get_nowait().path).unlink(missing_ok=True)
+
+    def submit(self, filename: str, path: str, process: Callable[..., Awaitable[dict]]) -> IngestionJob:
+        """Queue `process(path, filename, progress=...)`; raises JobQueueFull"""
+        self.start()
+        job = IngestionJob(filename, path, process)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"{self.max_queued} ingestion jobs are already queued")
+        self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def snapshots(self) -> list:
+        return [job.snapshot() for job in self._jobs.values()]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.set_status("running")
+            try:
+                job.result = await job.process(job.path, job.filename, progress=job.update)
+                job.set_status("succeeded")
+            except asyncio.CancelledError:
+                job.error = "Ingestion cancelled by shutdown"
+                job.set_status("failed")
+                raise
+            except Exception as e:
+                print(f"Ingestion job {job.job_id} ({job.filename}) failed: {e}")
+                job.error = str(e)
+                job.set_status("failed")
+            finally:
+                Path(job.path).unlink(missing_ok=True)
+                asyncio.get_running_loop().call_later(self.retention_seconds, self._jobs.pop, job.job_id, None)
+
+
+ingestion_jobs = IngestionJobManager()
+
+
+__all__ = ["IngestionJob", "IngestionJobManager", "JobQueueFull", "ingestion_jobs"]
@@ -0,0 +1,330 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from pypdf import PdfReader
+
+from config import (
+    PDF_EXTRACT_WORKERS,
+    PDF_PAGES_PER_TASK,
+    INGEST_QUEUE_SIZE,
+    INGEST_EMBED_BATCH,
+    INGEST_EMBED_WORKERS,
+    INGEST_UPSERT_BATCH,
+    INGEST_BULK_MIN_PAGES,
+    QDRANT_BULK_PARALLEL,
+)
+from .document_manifest import ChunkIdAssigner
+
+# End-of-stream marker between stages
+_DONE = object()
+
+
+# -------- process pool --------
+
+def _count_pages(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def _extract_pages(path: str, start: int, end: int) -> Tuple[List[Tuple[int, str]], float]:
+    """Runs in a worker process: text of pages [start, end) and the seconds it took"""
+    started = time.monotonic()
+    reader = PdfReader(path)
+    pages = [(i, reader.pages[i].extract_text() or "") for i in range(start, end)]
+    return pages, time.monotonic() - started
+
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all PDF extractions, created on first use"""
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+    return _pdf_pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(cancel_futures=True)
+        _pdf_pool = None
+
+
+# -------- stats --------
+
+class StageStats:
+    """Items handled and busy time of one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self._active = 0
+        self._since = 0.0
+
+    def record(self, items: int, started: float) -> None:
+        self.add(items, time.monotonic() - started)
+
+    def add(self, items: int, seconds: float) -> None:
+        self.items += items
+        self.busy += seconds
+
+    @contextmanager
+    def measure(self, items: int):
+        """Busy while any call is inside; overlapping calls count once (wall-clock union)"""
+        if not self._active:
+            self._since = time.monotonic()
+        self._active += 1
+        try:
+            yield
+            self.items += items
+        finally:
+            self._active -= 1
+            if not self._active:
+                self.busy += time.monotonic() - self._since
+
+    def as_dict(self) -> dict:
+        return {
+            "items": self.items,
+            "busy_seconds": round(self.busy, 3),
+            "items_per_second": round(self.items / self.busy, 1) if self.busy else None,
+        }
+
+
+# -------- pipeline --------
+
+class _RunState:
+    """State of one `PdfIngestionPipeline.run`; the pipeline itself holds only settings"""
+
+    def __init__(self, filename: str, known_ids: Set[str], progress: Optional[Callable[..., None]]):
+        self.filename = filename
+        self.known_ids = known_ids
+        self.progress = progress or (lambda **counters: None)
+        self.point_ids: List[str] = []
+        self.skipped = 0
+        self.stats = {name: StageStats(name) for name in ("extract", "chunk", "embed", "upsert")}
+
+
+class PdfIngestionPipeline:
+    """Overlapped extract -> chunk -> embed -> upsert ingestion of one PDF.
+
+    Stages run concurrently and hand work over through bounded queues, so a
+    large PDF ingests at the pace of the slowest stage and memory stays
+    bounded. Page text is extracted in a process pool, chunks from several
+    pages are embedded together and points are upserted in batches through
+    an `AsyncQdrantStorage`.
+    """
+
+    def __init__(
+        self,
+        ingestor,
+        vector_db,
+        splitter,
+        pages_per_task: int = PDF_PAGES_PER_TASK,
+        queue_size: int = INGEST_QUEUE_SIZE,
+        embed_batch: int = INGEST_EMBED_BATCH,
+        embed_workers: int = INGEST_EMBED_WORKERS,
+        upsert_batch: int = INGEST_UPSERT_BATCH,
+        upsert_parallel: int = QDRANT_BULK_PARALLEL,
+        bulk_min_pages: int = INGEST_BULK_MIN_PAGES,
+    ):
+        self.ingestor = ingestor
+        self.vector_db = vector_db
+        self.splitter = splitter
+        self.pages_per_task = pages_per_task
+        self.queue_size = queue_size
+        self.embed_batch = embed_batch
+        self.embed_workers = embed_workers
+        self.upsert_batch = upsert_batch
+        self.upsert_parallel = upsert_parallel
+        self.bulk_min_pages = bulk_min_pages
+
+    async def run(
+        self,
+        pdf_path: str,
+        filename: str,
+        known_ids: Optional[Set[str]] = None,
+        progress: Optional[Callable[..., None]] = None,
+    ) -> Dict[str, any]:
+        """Ingest the PDF at `pdf_path`; returns its point ids and per-stage stats
+
+        Chunks get deterministic ids; those in `known_ids` (already indexed
+        by a previous upload) skip embedding and upsert. `progress(**counters)`
+        is called as pages are chunked and points are written. Documents of
+        at least `bulk_min_pages` pages are loaded with HNSW indexing paused
+        (`AsyncQdrantStorage.bulk_load`).
+        """
+        state = _RunState(filename, known_ids or set(), progress)
+        pages_q = asyncio.Queue(maxsize=self.queue_size)
+        chunks_q = asyncio.Queue(maxsize=self.queue_size * self.embed_batch)
+        points_q = asyncio.Queue(maxsize=self.queue_size)
+        stats = state.stats
+
+        started = time.monotonic()
+        page_count = await asyncio.get_running_loop().run_in_executor(get_pdf_pool(), _count_pages, pdf_path)
+        state.progress(pages_total=page_count)
+        bulk = page_count >= self.bulk_min_pages
+
+        try:
+            async with self.vector_db.bulk_load() if bulk else nullcontext():
+                async with asyncio.TaskGroup() as tg:
+                    tg.create_task(self._extract(pdf_path, page_count, pages_q, stats["extract"]))
+                    tg.create_task(self._chunk(state, pages_q, chunks_q))
+                    for _ in range(self.embed_workers):
+                        tg.create_task(self._embed(chunks_q, points_q, stats["embed"]))
+                    tg.create_task(self._upsert(state, points_q))
+        except ExceptionGroup as eg:
+            # Surface the original error to the route, not the group
+            raise eg.exceptions[0]
+
+        wall = time.monotonic() - started
+        return {
+            "chunks": len(state.point_ids),
+            "embedded": stats["upsert"].items,
+            "unchanged": state.skipped,
+            "point_ids": state.point_ids,
+            "pages": stats["extract"].items,
+            "bulk_load": bulk,
+            "wall_seconds": round(wall, 3),
+            "stages": {name: s.as_dict() for name, s in stats.items()},
+        }
+
+    async def _extract(self, pdf_path: str, page_count: int, out: asyncio.Queue, stats: StageStats) -> None:
+        loop = asyncio.get_running_loop()
+        pool = get_pdf_pool()
+
+        # Keep a few page ranges in flight, hand them over in page order
+        in_flight = []
+        try:
+            for start in range(0, page_count, self.pages_per_task):
+                in_flight.append(loop.run_in_executor(
+                    pool, _extract_pages, pdf_path, start, min(start + self.pages_per_task, page_count)
+                ))
+                if len(in_flight) >= PDF_EXTRACT_WORKERS * 2:
+                    await self._emit_pages(in_flight.pop(0), out, stats)
+
+            while in_flight:
+                await self._emit_pages(in_flight.pop(0), out, stats)
+        finally:
+            # A failed or cancelled run must not leave its page ranges queued in the shared pool
+            for future in in_flight:
+                future.cancel()
+        await out.put(_DONE)
+
+    @staticmethod
+    async def _emit_pages(future, out: asyncio.Queue, stats: StageStats) -> None:
+        # Busy time is measured in the worker; in-flight ranges overlap on the loop's clock
+        pages, seconds = await future
+        stats.add(len(pages), seconds)
+        for page in pages:
+            await out.put(page)
+
+    async def _chunk(self, state: _RunState, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+        stats = state.stats["chunk"]
+        assign_id = ChunkIdAssigner(state.filename)
+        pages_done = 0
+        while (item := await inp.get()) is not _DONE:
+            page, text = item
+            pages_done += 1
+
+            started = time.monotonic()
+            chunks = [c for c in self.splitter.split_text(text) if c.strip()] if text.strip() else []
+            stats.record(len(chunks), started)
+            for chunk in chunks:
+                point_id = assign_id(page, chunk)
+                state.point_ids.append(point_id)
+                if point_id in state.known_ids:
+                    state.skipped += 1
+                    continue
+                await out.put((point_id, chunk, {"text": chunk, "source": state.filename, "page": page}))
+
+            state.progress(pages_done=pages_done, chunks_total=len(state.point_ids), chunks_unchanged=state.skipped)
+
+        for _ in range(self.embed_workers):
+            await out.put(_DONE)
+
+    async def _embed(self, inp: asyncio.Queue, out: asyncio.Queue, stats: StageStats) -> None:
+        done = False
+        while not done:
+            # Fill a cross-page batch; take what is ready once the first chunk arrived
+            batch = []
+            item = await inp.get()
+            while item is not _DONE:
+                batch.append(item)
+                if len(batch) >= self.embed_batch:
+                    break
+                try:
+                    item = inp.get_nowait()
+                except asyncio.QueueEmpty:
+                    if len(batch) >= self.ingestor.batch_size:
+                        break
+                    item = await inp.get()
+            done = item is _DONE
+
+            if not batch:
+                continue
+
+            ids = [point_id for point_id, _, _ in batch]
+            texts = [text for _, text, _ in batch]
+            payloads = [payload for _, _, payload in batch]
+            # Embed workers overlap, so busy time is their union
+            with stats.measure(len(batch)):
+                vectors = await self.ingestor.aembed_texts(texts)
+            await out.put((ids, vectors, payloads))
+
+        await out.put(_DONE)
+
+    async def _upsert(self, state: _RunState, inp: asyncio.Queue) -> None:
+        """Write points in columnar batches, `upsert_parallel` of them in flight
+
+        In-flight batches are only acknowledged; the last one is sent after
+        all others were and waits for completion. Updates apply in order, so
+        it is the consistency barrier of the whole document.
+        """
+        stats = state.stats["upsert"]
+        ids, vectors, payloads = [], [], []
+        remaining = self.embed_workers
+        in_flight = set()
+
+        async def send(batch_ids, batch_vectors, batch_payloads, wait: bool) -> None:
+            with stats.measure(len(batch_ids)):
+                await self.vector_db.upsert(ids=batch_ids, vectors=batch_vectors, payloads=batch_payloads, wait=wait)
+            state.progress(chunks_embedded=stats.items)
+
+        async def flush(count: int) -> None:
+            nonlocal ids, vectors, payloads
+            if len(in_flight) >= self.upsert_parallel:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                in_flight.difference_update(done)
+                for task in done:
+                    task.result()
+            in_flight.add(asyncio.create_task(send(ids[:count], vectors[:count], payloads[:count], wait=False)))
+            ids, vectors, payloads = ids[count:], vectors[count:], payloads[count:]
+
+        try:
+            while remaining:
+                item = await inp.get()
+                if item is _DONE:
+                    remaining -= 1
+                    continue
+                ids.extend(item[0])
+                vectors.extend(item[1])
+                payloads.extend(item[2])
+                # Strictly more than a batch: the barrier always has points left to wait on
+                while len(ids) > self.upsert_batch:
+                    await flush(self.upsert_batch)
+
+            await asyncio.gather(*in_flight)
+            in_flight.clear()
+            if ids:
+                await send(ids, vectors, payloads, wait=True)
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+
+__all__ = ["PdfIngestionPipeline", "StageStats", "get_pdf_pool", "shutdown_pdf_pool"]
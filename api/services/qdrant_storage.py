@@ -1,5 +1,11 @@
-from typing import List, Dict, Optional
-from qdrant_client import QdrantClient
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import numpy as np
+from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.http import models as rest
 from qdrant_client.models import (
     VectorParams,
@@ -8,45 +14,286 @@ from qdrant_client.models import (
     Filter,
     FieldCondition,
     MatchValue,
-    PointIdsList
+    PointIdsList,
+    PayloadSchemaType,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    SearchParams,
+    QuantizationSearchParams,
+    VectorParamsDiff,
+    OptimizersConfigDiff,
+    Disabled,
+    Batch,
+)
+from config import (
+    QDRANT_URI,
+    QDRANT_VECTOR_DIM,
+    QDRANT_QUANTIZATION,
+    QDRANT_ON_DISK,
+    QDRANT_MIGRATE_STORAGE,
+    QDRANT_OVERSAMPLING,
+    QDRANT_RESCORE,
+    QDRANT_SCROLL_PAGE_SIZE,
+    QDRANT_POOL_SIZE,
+    QDRANT_PREFER_GRPC,
+    QDRANT_GRPC_PORT,
+    QDRANT_BULK_BATCH_SIZE,
+    QDRANT_BULK_PARALLEL,
+    QDRANT_INDEXING_THRESHOLD,
+    QDRANT_BULK_LEASE_SECONDS,
 )
-from config import QDRANT_URI
+
+
+def _source_filter(filename: str) -> Filter:
+    return Filter(
+        must=[
+            FieldCondition(
+                key="source",
+                match=MatchValue(value=filename)
+            )
+        ]
+    )
+
+
+def _search_params(quantization: str, oversampling: float, rescore: bool) -> Optional[SearchParams]:
+    if quantization == "none":
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=rescore,
+            oversampling=oversampling,
+        )
+    )
+
+
+def _points(ids, vectors, payloads) -> List[PointStruct]:
+    return [
+        PointStruct(
+            id=ids[i],
+            vector=vectors[i],
+            payload=payloads[i]
+        )
+        for i in range(len(ids))
+    ]
+
+
+def _batch(ids, vectors, payloads) -> Batch:
+    """One columnar `Batch`; `vectors` may be a 2-d numpy array, converted in one call"""
+    if isinstance(vectors, np.ndarray):
+        vectors = vectors.astype(np.float32, copy=False).tolist()
+    return Batch(
+        ids=list(ids),
+        vectors=list(vectors),
+        payloads=list(payloads) if payloads is not None else None,
+    )
+
+
+def _batches(ids, vectors, payloads, batch_size: int) -> Iterator[Batch]:
+    """Columnar `Batch`es over ids / vectors / payloads, no per-point objects"""
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        yield _batch(ids[start:end], vectors[start:end], payloads[start:end] if payloads is not None else None)
+
+
+def _contexts(points) -> Dict[str, list]:
+    """Texts and distinct sources of search hits"""
+    contexts = []
+    sources = set()
+
+    for point in points:
+        text = point.payload.get("text", "")
+        if not text:
+            continue
+
+        source = point.payload.get("source", "")
+        contexts.append(text)
+        sources.add(source)
+
+    return {"contexts": contexts, "sources": list(sources)}
+
+
+class EmbeddingMismatchError(RuntimeError):
+    """The collection's vectors come from a different embedding than the configured one"""
 
 
 class QdrantStorage:
-    def __init__(self, url=QDRANT_URI, collection_name="docs", dim=3072):
-        self.client = QdrantClient(url=url, timeout=30)
+    """Qdrant collection wrapper.
+
+    Vectors can be stored quantized (`scalar`: int8, ~4x smaller; `binary`:
+    1 bit per dimension, ~32x smaller) with the quantized copy kept in RAM and
+    the originals optionally on disk. Searches then oversample on the
+    quantized vectors and rescore the candidates with the originals.
+    """
+
+    QUANTIZATION_MODES = ("none", "scalar", "binary")
+
+    def __init__(
+            self,
+            url=QDRANT_URI,
+            collection_name="docs",
+            dim=QDRANT_VECTOR_DIM,
+            quantization=QDRANT_QUANTIZATION,
+            on_disk=QDRANT_ON_DISK,
+            oversampling=QDRANT_OVERSAMPLING,
+            rescore=QDRANT_RESCORE,
+            migrate_storage=QDRANT_MIGRATE_STORAGE,
+            indexing_threshold=QDRANT_INDEXING_THRESHOLD,
+            embedding: Optional[dict] = None,
+            pool_size=QDRANT_POOL_SIZE,
+            prefer_grpc=QDRANT_PREFER_GRPC,
+            grpc_port=QDRANT_GRPC_PORT,
+    ):
+        if quantization not in self.QUANTIZATION_MODES:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+
+        self.client = QdrantClient(
+            url=url,
+            timeout=30,
+            pool_size=pool_size,
+            prefer_grpc=prefer_grpc,
+            grpc_port=grpc_port,
+        )
         self.collection = collection_name
+        self.dim = dim
+        self.quantization = quantization
+        self.on_disk = on_disk
+        self.oversampling = oversampling
+        self.rescore = rescore
+        self.migrate_storage = migrate_storage
+        self.indexing_threshold = indexing_threshold
+        # Provider / model / dimension the vectors come from, stored as collection metadata
+        self.embedding = embedding
+
         if not self.client.collection_exists(self.collection):
-            self.client.create_collection(
+            self._create_collection()
+
+    def _create_collection(self) -> None:
+        self.client.create_collection(
+            collection_name=self.collection,
+            vectors_config=VectorParams(size=self.dim, distance=Distance.COSINE, on_disk=self.on_disk),
+            quantization_config=self._quantization_config(),
+            metadata=self.embedding,
+        )
+        # Index filtered fields up front, before any points are written
+        self.ensure_payload_indexes()
+
+    def _quantization_config(self):
+        if self.quantization == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if self.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def _search_params(self) -> Optional[SearchParams]:
+        return _search_params(self.quantization, self.oversampling, self.rescore)
+
+    def ensure_storage_config(self, bulk_load_active: bool = False) -> None:
+        """Compare an existing collection with the configured storage settings
+
+        Differences in quantization and on-disk storage are only reported,
+        unless `migrate_storage` (QDRANT_MIGRATE_STORAGE) is set: then they are
+        applied in place and Qdrant rebuilds in the background. The vector
+        size can't be changed in place: a collection built by a different
+        embedding raises `EmbeddingMismatchError`, so startup fails instead of
+        serving searches that can't match.
+
+        Indexing paused by a bulk load that never finished (worker killed
+        mid-load) is turned back on, unless a load is still holding a lease.
+        """
+        params = self.client.get_collection(self.collection).config
+        threshold = params.optimizer_config.indexing_threshold
+        if threshold == 0 and self.indexing_threshold != 0 and not bulk_load_active:
+            self.client.update_collection(
                 collection_name=self.collection,
-                vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+                optimizers_config=OptimizersConfigDiff(indexing_threshold=self.indexing_threshold),
             )
+            print(f"Collection {self.collection}: indexing re-enabled after an unfinished bulk load")
 
-    def delete_by_source(self, filename: str):
-        self.client.delete(
-            collection_name=self.collection,
-            points_selector=rest.Filter(
-                must=[
-                    rest.FieldCondition(
-                        key="source",
-                        match=rest.MatchValue(value=filename)
-                    )
-                ]
+        vectors = params.params.vectors
+        if not isinstance(vectors, VectorParams):
+            print(
+                f"Collection {self.collection} uses named vectors ({', '.join(vectors or {})}); "
+                f"storage settings are not managed for it"
+            )
+            return
+
+        if vectors.size != self.dim:
+            raise EmbeddingMismatchError(
+                f"Collection {self.collection} has {vectors.size}-dim vectors, but the configured "
+                f"embedding produces {self.dim}; set EMBED_PROVIDER / EMBED_DIMENSIONS to match "
+                f"or recreate the collection with clear_collection()"
+            )
+        self._check_embedding_tag(params.metadata or {}, vectors.size)
+
+        changes = {}
+        quantization = self._quantization_config()
+        if type(params.quantization_config) is not type(quantization):
+            # None would leave the current quantization in place
+            changes["quantization_config"] = quantization if quantization is not None else Disabled.DISABLED
+        if bool(vectors.on_disk) != self.on_disk:
+            changes["vectors_config"] = {"": VectorParamsDiff(on_disk=self.on_disk)}
+
+        if changes and not self.migrate_storage:
+            print(
+                f"Collection {self.collection} differs from the configured storage "
+                f"(quantization={self.quantization}, on_disk={self.on_disk}); "
+                f"set QDRANT_MIGRATE_STORAGE=true to convert it"
+            )
+        elif changes:
+            self.client.update_collection(collection_name=self.collection, **changes)
+            print(
+                f"Collection {self.collection}: converted to quantization={self.quantization}, "
+                f"on_disk={self.on_disk}"
             )
+
+    def _check_embedding_tag(self, metadata: dict, size: int) -> None:
+        if not self.embedding:
+            return
+        tag = {k: metadata.get(k) for k in self.embedding}
+        if tag == self.embedding:
+            return
+        if not any(tag.values()) and size == self.embedding.get("embedding_dim"):
+            # Collection from before tagging: claim it for the configured provider
+            self.client.update_collection(collection_name=self.collection, metadata=self.embedding)
+            return
+        raise EmbeddingMismatchError(
+            f"Collection {self.collection} was built with {tag}, but the configured "
+            f"embedding is {self.embedding}; searches would not match until it is rebuilt"
         )
 
+    def embedding_tag(self) -> dict:
+        """Embedding provider / model / dimension the collection was built with"""
+        return self.client.get_collection(self.collection).config.metadata or {}
+
+    # Payload fields filtered on by search, delete and listing
+    PAYLOAD_INDEXES = {
+        "source": PayloadSchemaType.KEYWORD,
+    }
+
+    def ensure_payload_indexes(self) -> None:
+        """Create missing payload indexes (idempotent)"""
+        existing = self.client.get_collection(self.collection).payload_schema or {}
+        for field_name, schema in self.PAYLOAD_INDEXES.items():
+            if field_name in existing:
+                continue
+            self.client.create_payload_index(
+                collection_name=self.collection,
+                field_name=field_name,
+                field_schema=schema,
+                wait=True,
+            )
+
+    def close(self) -> None:
+        self.client.close()
+
     def upsert(self, ids, vectors, payloads):
         """Add or update documents in the collection"""
-        points = [
-            PointStruct(
-                id=ids[i],
-                vector=vectors[i],
-                payload=payloads[i]
-            )
-            for i in range(len(ids))
-        ]
-        self.client.upsert(self.collection, points=points)
+        self.client.upsert(self.collection, points=_points(ids, vectors, payloads))
 
     def search(
             self,
@@ -55,38 +302,18 @@ class QdrantStorage:
             filename: str = None
     ):
         """Search for similar documents"""
-        search_filter = None
-        if filename:
-            search_filter = Filter(
-                must=[
-                    FieldCondition(
-                        key="source",
-                        match=MatchValue(value=filename)
-                    )
-                ]
-            )
+        search_filter = _source_filter(filename) if filename else None
 
         results = self.client.query_points(
             collection_name=self.collection,
             query=query_vector,
             query_filter=search_filter,
+            search_params=self._search_params(),
             limit=top_k,
             with_payload=True,
         )
 
-        contexts = []
-        sources = set()
-
-        for point in results.points:
-            text = point.payload.get("text", "")
-            if not text:
-                continue
-
-            source = point.payload.get("source", "")
-            contexts.append(text)
-            sources.add(source)
-
-        return {"contexts": contexts, "sources": list(sources)}
+        return _contexts(results.points)
 
     def delete_by_ids(self, ids: List[str]) -> None:
         """Delete specific documents by their IDs"""
@@ -98,77 +325,92 @@ class QdrantStorage:
     def delete_by_source(self, filename: str) -> int:
         """Delete all documents from a specific source file
 
+        One count and one filtered delete, both evaluated by Qdrant on the
+        `source` index; no point ids are fetched.
+
         Args:
             filename: Name of the source file to delete
 
         Returns:
             Number of documents deleted
         """
-        # First, get all point IDs for this source
-        ids_to_delete = self.get_ids_by_source(filename)
+        source_filter = _source_filter(filename)
+        deleted = self.count_source(filename)
 
-        if not ids_to_delete:
+        if not deleted:
             print(f"No documents found for source: {filename}")
             return 0
 
-        # Delete using the filter
         self.client.delete(
             collection_name=self.collection,
-            points_selector=Filter(
-                must=[
-                    FieldCondition(
-                        key="source",
-                        match=MatchValue(value=filename)
-                    )
-                ]
-            ),
+            points_selector=rest.FilterSelector(filter=source_filter),
         )
 
-        print(f"Deleted {len(ids_to_delete)} documents from source: {filename}")
-        return len(ids_to_delete)
+        print(f"Deleted {deleted} documents from source: {filename}")
+        return deleted
 
-    def get_ids_by_source(self, filename: str) -> List[str]:
-        """Get all document IDs for a specific source file"""
-        results = self.client.scroll(
+    def count_source(self, filename: str) -> int:
+        """Exact number of points of a source file, counted server-side"""
+        return self.client.count(
             collection_name=self.collection,
-            scroll_filter=Filter(
-                must=[
-                    FieldCondition(
-                        key="source",
-                        match=MatchValue(value=filename)
-                    )
-                ]
-            ),
-            limit=10000,
+            count_filter=_source_filter(filename),
+            exact=True,
+        ).count
+
+    def scroll(
+            self,
+            scroll_filter: Optional[Filter] = None,
+            page_size: int = QDRANT_SCROLL_PAGE_SIZE,
             with_payload=False,
-            with_vectors=False
-        )
+            with_vectors=False,
+    ) -> Iterator:
+        """Yield every matching point, fetching `page_size` points per request"""
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection,
+                scroll_filter=scroll_filter,
+                limit=page_size,
+                offset=offset,
+                with_payload=with_payload,
+                with_vectors=with_vectors,
+            )
+            yield from points
+            if offset is None:
+                return
 
-        return [str(point.id) for point in results[0]]
+    def iter_ids_by_source(self, filename: str, page_size: int = QDRANT_SCROLL_PAGE_SIZE) -> Iterator[str]:
+        """Point ids of a source file, one scroll page at a time"""
+        for point in self.scroll(_source_filter(filename), page_size=page_size):
+            yield str(point.id)
 
-    def list_sources(self) -> List[Dict[str, any]]:
-        """List all unique source files in the collection with document counts"""
-        # Get all points with their payloads
-        all_points, _ = self.client.scroll(
-            collection_name=self.collection,
-            limit=10000,
-            with_payload=True,
-            with_vectors=False
-        )
+    def get_ids_by_source(self, filename: str) -> List[str]:
+        """Get all document IDs for a specific source file"""
+        return list(self.iter_ids_by_source(filename))
 
-        # Count documents per source
-        source_counts = {}
-        for point in all_points:
-            source = point.payload.get("source", "unknown")
-            source_counts[source] = source_counts.get(source, 0) + 1
+    def list_sources(self) -> List[Dict[str, any]]:
+        """Unique source files with their point counts
 
-        # Format the result
-        sources_list = [
+        Counted server-side with a facet on the `source` keyword index, so no
+        points are transferred.
+        """
+        return [
             {"filename": source, "document_count": count}
-            for source, count in sorted(source_counts.items())
+            for source, count in sorted(self.count_by_source().items())
         ]
 
-        return sources_list
+    # Upper bound on distinct sources returned by a facet
+    MAX_SOURCES = 100_000
+
+    def count_by_source(self) -> Dict[str, int]:
+        """Exact number of points per `source` value"""
+        result = self.client.facet(
+            collection_name=self.collection,
+            key="source",
+            limit=self.MAX_SOURCES,
+            exact=True,
+        )
+        return {hit.value: hit.count for hit in result.hits}
 
     def get_collection_info(self) -> Dict:
         """Get information about the collection"""
@@ -183,12 +425,250 @@ class QdrantStorage:
     def clear_collection(self) -> None:
         """Delete all documents from the collection"""
         self.client.delete_collection(self.collection)
-        # Recreate the collection
-        self.client.create_collection(
+        # Recreate the collection with the configured size and quantization
+        self._create_collection()
+        print(f"Collection {self.collection} cleared and recreated")
+
+
+class AsyncQdrantStorage:
+    """Async counterpart of `QdrantStorage` for the data path.
+
+    Same search / upsert / delete / scroll interface on `AsyncQdrantClient`,
+    so async routes, tools and the ingestion pipeline don't block the event
+    loop. Collection setup and config checks stay on the sync class, which
+    must have created the collection first. With `prefer_grpc` calls go over
+    gRPC (port `grpc_port`) instead of HTTP.
+    """
+
+    MAX_SOURCES = QdrantStorage.MAX_SOURCES
+
+    def __init__(
+            self,
+            url=QDRANT_URI,
+            collection_name="docs",
+            quantization=QDRANT_QUANTIZATION,
+            oversampling=QDRANT_OVERSAMPLING,
+            rescore=QDRANT_RESCORE,
+            pool_size=QDRANT_POOL_SIZE,
+            prefer_grpc=QDRANT_PREFER_GRPC,
+            grpc_port=QDRANT_GRPC_PORT,
+            indexing_threshold=QDRANT_INDEXING_THRESHOLD,
+            leases=None,
+            lease_seconds=QDRANT_BULK_LEASE_SECONDS,
+    ):
+        self.client = AsyncQdrantClient(
+            url=url,
+            timeout=30,
+            pool_size=pool_size,
+            prefer_grpc=prefer_grpc,
+            grpc_port=grpc_port,
+        )
+        self.collection = collection_name
+        self.search_params = _search_params(quantization, oversampling, rescore)
+        self.indexing_threshold = indexing_threshold
+        # Mongo collection of bulk-load leases, shared by all workers
+        self.leases = leases
+        self.lease_seconds = lease_seconds
+
+    @classmethod
+    def like(cls, storage: QdrantStorage, **kwargs) -> "AsyncQdrantStorage":
+        """Async storage on the same collection and search settings as `storage`"""
+        return cls(
+            collection_name=storage.collection,
+            quantization=storage.quantization,
+            oversampling=storage.oversampling,
+            rescore=storage.rescore,
+            indexing_threshold=storage.indexing_threshold,
+            **kwargs,
+        )
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    async def upsert(self, ids, vectors, payloads, wait: bool = True) -> None:
+        """Add or update documents in the collection
+
+        With `wait=False` Qdrant acknowledges before applying the update; a
+        later waited update on the collection implies it was applied.
+        """
+        await self.client.upsert(self.collection, points=_batch(ids, vectors, payloads), wait=wait)
+
+    async def bulk_upsert(
+            self,
+            ids,
+            vectors,
+            payloads=None,
+            batch_size: int = QDRANT_BULK_BATCH_SIZE,
+            parallel: int = QDRANT_BULK_PARALLEL,
+    ) -> int:
+        """Load many points fast; returns the number of points written
+
+        Columnar batches go out `parallel` at a time with `wait=False`, so
+        Qdrant only acknowledges them. The last batch is sent after all
+        others were acknowledged and waits for completion; updates apply in
+        order, so it doubles as a consistency barrier. Indexing is not
+        touched; wrap a large load in `bulk_load`.
+        """
+        if not len(ids):
+            return 0
+
+        batches = list(_batches(ids, vectors, payloads, batch_size))
+        semaphore = asyncio.Semaphore(parallel)
+
+        async def send(batch: Batch) -> None:
+            async with semaphore:
+                await self.client.upsert(self.collection, points=batch, wait=False)
+
+        await asyncio.gather(*(send(batch) for batch in batches[:-1]))
+        # Barrier: applied in order, so this one completing means all did
+        await self.client.upsert(self.collection, points=batches[-1], wait=True)
+        return len(ids)
+
+    @asynccontextmanager
+    async def bulk_load(self):
+        """Hold back HNSW indexing while a large load runs
+
+        Sets `indexing_threshold` to 0, so Qdrant builds the index once at
+        the end instead of re-indexing segments while they grow. Searches
+        stay correct meanwhile; unindexed segments are scanned exactly.
+
+        Every load, in any worker process, holds a lease in Mongo. The lease
+        is renewed while the load runs. The configured threshold is restored
+        when the last live lease is released. A lease left by a killed worker
+        expires, and startup then turns indexing back on (see
+        `QdrantStorage.ensure_storage_config`). Without `leases` this does
+        nothing.
+        """
+        if self.leases is None:
+            yield
+            return
+
+        token = uuid.uuid4().hex
+        await self._renew_lease(token)
+        await self._set_indexing_threshold(0)
+        renewer = asyncio.create_task(self._keep_lease(token))
+        try:
+            yield
+        finally:
+            renewer.cancel()
+            await self.leases.update_one({"_id": self.collection}, {"$unset": {f"holders.{token}": ""}})
+            if not await self.bulk_load_active():
+                await self._set_indexing_threshold(self.indexing_threshold)
+                # A load that started in between needs indexing held back again
+                if await self.bulk_load_active():
+                    await self._set_indexing_threshold(0)
+
+    async def bulk_load_active(self) -> bool:
+        """Whether any worker holds a live bulk-load lease on the collection"""
+        if self.leases is None:
+            return False
+        doc = await self.leases.find_one({"_id": self.collection}) or {}
+        now = datetime.utcnow()
+        return any(expires > now for expires in doc.get("holders", {}).values())
+
+    async def _renew_lease(self, token: str) -> None:
+        await self.leases.update_one(
+            {"_id": self.collection},
+            {"$set": {f"holders.{token}": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+            upsert=True,
+        )
+
+    async def _keep_lease(self, token: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self._renew_lease(token)
+
+    async def _set_indexing_threshold(self, threshold: int) -> None:
+        await self.client.update_collection(
             collection_name=self.collection,
-            vectors_config=VectorParams(size=3072, distance=Distance.COSINE),
+            optimizers_config=OptimizersConfigDiff(indexing_threshold=threshold),
         )
-        print(f"Collection {self.collection} cleared and recreated")
+
+    async def search(
+            self,
+            query_vector,
+            top_k: int = 5,
+            filename: str = None
+    ):
+        """Search for similar documents"""
+        results = await self.client.query_points(
+            collection_name=self.collection,
+            query=query_vector,
+            query_filter=_source_filter(filename) if filename else None,
+            search_params=self.search_params,
+            limit=top_k,
+            with_payload=True,
+        )
+        return _contexts(results.points)
+
+    async def delete_by_ids(self, ids: List[str]) -> None:
+        await self.client.delete(
+            collection_name=self.collection,
+            points_selector=PointIdsList(points=ids),
+        )
+
+    async def delete_by_source(self, filename: str) -> int:
+        """Delete all points of a source file with one filtered delete; returns the count"""
+        deleted = await self.count_source(filename)
+        if not deleted:
+            print(f"No documents found for source: {filename}")
+            return 0
+
+        await self.client.delete(
+            collection_name=self.collection,
+            points_selector=rest.FilterSelector(filter=_source_filter(filename)),
+        )
+        print(f"Deleted {deleted} documents from source: {filename}")
+        return deleted
+
+    async def count_source(self, filename: str) -> int:
+        result = await self.client.count(
+            collection_name=self.collection,
+            count_filter=_source_filter(filename),
+            exact=True,
+        )
+        return result.count
+
+    async def scroll(
+            self,
+            scroll_filter: Optional[Filter] = None,
+            page_size: int = QDRANT_SCROLL_PAGE_SIZE,
+            with_payload=False,
+            with_vectors=False,
+    ) -> AsyncIterator:
+        """Yield every matching point, fetching `page_size` points per request"""
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection,
+                scroll_filter=scroll_filter,
+                limit=page_size,
+                offset=offset,
+                with_payload=with_payload,
+                with_vectors=with_vectors,
+            )
+            for point in points:
+                yield point
+            if offset is None:
+                return
+
+    async def get_ids_by_source(self, filename: str, page_size: int = QDRANT_SCROLL_PAGE_SIZE) -> List[str]:
+        return [str(point.id) async for point in self.scroll(_source_filter(filename), page_size=page_size)]
+
+    async def count_by_source(self) -> Dict[str, int]:
+        result = await self.client.facet(
+            collection_name=self.collection,
+            key="source",
+            limit=self.MAX_SOURCES,
+            exact=True,
+        )
+        return {hit.value: hit.count for hit in result.hits}
+
+    async def list_sources(self) -> List[Dict[str, any]]:
+        return [
+            {"filename": source, "document_count": count}
+            for source, count in sorted((await self.count_by_source()).items())
+        ]
 
 
-__all__ = ["QdrantStorage"]
\ No newline at end of file
+__all__ = ["QdrantStorage", "AsyncQdrantStorage", "EmbeddingMismatchError"]
\ No newline at end of file
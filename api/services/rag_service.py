@@ -1,19 +1,25 @@
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
 from pathlib import Path
+import asyncio
 import tempfile
-import uuid
-import numpy as np
-from openai import OpenAI
+import weakref
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
 
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
-from services import MultiSourceIngestor, QdrantStorage
-from config import OPENROUTER_API_KEY, OPENROUTER_API_HOST, DEFAULT_MODEL
+from services import MultiSourceIngestor, QdrantStorage, AsyncQdrantStorage, QueryEmbeddingCache, query_embedding_cache
+from services import InMemoryVectorIndex, PdfIngestionPipeline
+from services import ChunkIdAssigner, DocumentManifestStore, file_content_hash
+from database import get_db
+from config import OPENROUTER_API_KEY, OPENROUTER_API_HOST, DEFAULT_MODEL, OPENROUTER_POOL_SIZE
 
 
 class DocumentProcessor:
+    SUPPORTED_EXTENSIONS = {".pdf", ".txt", ".md"}
+
     def __init__(self, ingestor: MultiSourceIngestor):
         self.ingestor = ingestor
         self.splitter = RecursiveCharacterTextSplitter(
@@ -21,61 +27,77 @@ class DocumentProcessor:
             chunk_overlap=100,
         )
 
-    def stream_pdf_chunks(
-        self,
-        content: bytes,
-        filename: str,
-    ):
+    def extract_pdf_chunks(self, content: bytes) -> List[Tuple[str, Optional[int]]]:
+        """Split a whole PDF into (chunk, page) pairs without embedding"""
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
             tmp.write(content)
             pdf_path = tmp.name
 
         try:
-            loader = PyPDFLoader(pdf_path)
-
-            for page_doc in loader.lazy_load():
+            chunks = []
+            for page_doc in PyPDFLoader(pdf_path).lazy_load():
                 if not page_doc.page_content.strip():
                     continue
-
-                chunks = self.splitter.split_documents([page_doc])
-                texts = [c.page_content for c in chunks if c.page_content.strip()]
-
-                if not texts:
-                    continue
-
-                embeddings = self.ingestor.embed_texts(texts)
-
-                yield texts, embeddings, page_doc.metadata.get("page")
+                page = page_doc.metadata.get("page")
+                chunks.extend(
+                    (c.page_content, page)
+                    for c in self.splitter.split_documents([page_doc])
+                    if c.page_content.strip()
+                )
+            return chunks
 
         finally:
             Path(pdf_path).unlink(missing_ok=True)
 
-    def process_small_file(
-        self,
-        content: bytes,
-        filename: str,
-    ) -> Tuple[List[str], List[List[float]]]:
+    def chunk_small_file(self, content: bytes, filename: str) -> List[str]:
         ext = Path(filename).suffix.lower()
 
         if ext == ".pdf":
-            docs = self._load_pdf(content)
+            return [text for text, _ in self.extract_pdf_chunks(content)]
         elif ext in {".txt", ".md"}:
             docs = self._load_text(content, filename)
         else:
             raise ValueError(f"Unsupported file type: {ext}")
 
-        chunks = [
+        return [
             d.page_content
             for d in self.splitter.split_documents(docs)
             if d.page_content.strip()
         ]
 
+    def process_small_file(
+        self,
+        content: bytes,
+        filename: str,
+    ) -> Tuple[List[str], List[List[float]]]:
+        chunks = self.chunk_small_file(content, filename)
         embeddings = self.ingestor.embed_texts(chunks)
         return chunks, embeddings
 
+    @staticmethod
+    def _load_text(content: bytes, filename: str) -> List[Document]:
+        return [Document(page_content=content.decode("utf-8"), metadata={"source": filename})]
+
 class VectorSearchEngine:
-    def __init__(self, ingestor: MultiSourceIngestor):
+    def __init__(self, ingestor: MultiSourceIngestor, query_cache: QueryEmbeddingCache = query_embedding_cache):
         self.ingestor = ingestor
+        self.query_cache = query_cache
+
+    def embed_query(self, query: str) -> List[float]:
+        """Query embedding, served from the in-process cache when possible"""
+        # Cache keys are normalized (see QueryEmbeddingCache); the model always sees the query as typed
+        vector = self.query_cache.get(self.ingestor.model_key, query)
+        if vector is None:
+            vector = self.ingestor.embed_texts([query])[0]
+            self.query_cache.put(self.ingestor.model_key, query, vector)
+        return vector
+
+    async def aembed_query(self, query: str) -> List[float]:
+        vector = self.query_cache.get(self.ingestor.model_key, query)
+        if vector is None:
+            vector = (await self.ingestor.aembed_texts([query]))[0]
+            self.query_cache.put(self.ingestor.model_key, query, vector)
+        return vector
 
     def search_in_memory(
             self,
@@ -84,15 +106,18 @@ class VectorSearchEngine:
             embeddings: List[List[float]],
             top_k: int = 3
     ) -> List[str]:
-        query_embedding = self.ingestor.embed_texts([query])[0]
+        return self.search_index(query, InMemoryVectorIndex(embeddings, chunks), top_k)
 
-        scores = [
-            (i, self._cosine(query_embedding, emb))
-            for i, emb in enumerate(embeddings)
-        ]
+    def search_index(self, query: str, index: InMemoryVectorIndex, top_k: int = 3) -> List[str]:
+        """Top-k chunks of a prebuilt in-memory index"""
+        if not len(index):
+            return []
+        return [chunk for chunk, _ in index.search(self.embed_query(query), top_k)]
 
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return [chunks[i] for i, _ in scores[:top_k]]
+    async def asearch_index(self, query: str, index: InMemoryVectorIndex, top_k: int = 3) -> List[str]:
+        if not len(index):
+            return []
+        return [chunk for chunk, _ in index.search(await self.aembed_query(query), top_k)]
 
     def search_in_database(
             self,
@@ -101,26 +126,55 @@ class VectorSearchEngine:
             top_k: int = 3,
             filename: Optional[str] = None
     ) -> Dict[str, any]:
-        query_embedding = self.ingestor.embed_texts([query])[0]
+        query_embedding = self.embed_query(query)
         return vector_db.search(
             query_vector=query_embedding,
             top_k=top_k,
             filename=filename
         )
 
-    @staticmethod
-    def _cosine(a: List[float], b: List[float]) -> float:
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+    async def asearch_in_database(
+            self,
+            query: str,
+            vector_db: AsyncQdrantStorage,
+            top_k: int = 3,
+            filename: Optional[str] = None
+    ) -> Dict[str, any]:
+        query_embedding = await self.aembed_query(query)
+        return await vector_db.search(
+            query_vector=query_embedding,
+            top_k=top_k,
+            filename=filename
+        )
 
 
 class LLMQueryEngine:
+    EXTRA_HEADERS = {
+        "HTTP-Referer": "farukseker.com.tr",
+        "X-Title": "farukseker",
+    }
+
     def __init__(self, model: str = DEFAULT_MODEL):
+        limits = httpx.Limits(max_connections=OPENROUTER_POOL_SIZE, max_keepalive_connections=OPENROUTER_POOL_SIZE)
         self.client = OpenAI(
             base_url=OPENROUTER_API_HOST,
             api_key=OPENROUTER_API_KEY,
+            http_client=DefaultHttpxClient(limits=limits),
+        )
+        self.async_client = AsyncOpenAI(
+            base_url=OPENROUTER_API_HOST,
+            api_key=OPENROUTER_API_KEY,
+            http_client=DefaultAsyncHttpxClient(limits=limits),
         )
         self.model = model
 
+    def close(self) -> None:
+        self.client.close()
+
+    async def aclose(self) -> None:
+        self.client.close()
+        await self.async_client.close()
+
     def generate_answer(
             self,
             question: str,
@@ -130,13 +184,40 @@ class LLMQueryEngine:
         if not contexts:
             return "No relevant information found."
 
+        res = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": self._prompt(question, contexts, sources)}],
+            extra_headers=self.EXTRA_HEADERS,
+        )
+
+        return res.choices[0].message.content
+
+    async def agenerate_answer(
+            self,
+            question: str,
+            contexts: List[str],
+            sources: Optional[List[str]] = None
+    ) -> str:
+        if not contexts:
+            return "No relevant information found."
+
+        res = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": self._prompt(question, contexts, sources)}],
+            extra_headers=self.EXTRA_HEADERS,
+        )
+
+        return res.choices[0].message.content
+
+    @staticmethod
+    def _prompt(question: str, contexts: List[str], sources: Optional[List[str]]) -> str:
         context_text = "\n\n".join(
             f"[Chunk {i + 1}]\n{c}" for i, c in enumerate(contexts)
         )
 
         source_info = f"\nSources: {', '.join(sources)}" if sources else ""
 
-        prompt = f"""Answer the question using only the information below.
+        return f"""Answer the question using only the information below.
 If the answer is not present, say so explicitly.
 You may respond in any language.
 
@@ -149,95 +230,178 @@ Question: {question}
 Answer:
 """
 
-        res = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            extra_headers={
-                "HTTP-Referer": "farukseker.com.tr",
-                "X-Title": "farukseker",
-            }
-        )
-
-        return res.choices[0].message.content
-
 
 class RAGService:
     """RAG Service for document processing and question answering."""
 
-    TEMP_COLLECTION_NAME = "temp-collection"
-
     def __init__(self):
         self.ingestor = MultiSourceIngestor()
-        self.vector_db = QdrantStorage()
+        self.vector_db = QdrantStorage(
+            dim=self.ingestor.provider.dimension,
+            embedding=self.ingestor.provider.tag(),
+        )
+        # Non-blocking client on the same collection for the async paths
+        self.async_vector_db = AsyncQdrantStorage.like(self.vector_db, leases=get_db()['qdrant_bulk_loads'])
         self.doc_processor = DocumentProcessor(self.ingestor)
         self.search_engine = VectorSearchEngine(self.ingestor)
         self.llm_engine = LLMQueryEngine()
-
-    def process_and_store(
+        self.manifests = DocumentManifestStore()
+        # One ingest or removal per document at a time; entries go away when unused
+        self._source_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _source_lock(self, filename: str) -> asyncio.Lock:
+        lock = self._source_locks.get(filename)
+        if lock is None:
+            lock = self._source_locks[filename] = asyncio.Lock()
+        return lock
+
+    async def aclose(self) -> None:
+        self.vector_db.close()
+        await self.async_vector_db.close()
+        await self.llm_engine.aclose()
+        await self.ingestor.provider.aclose()
+
+    async def aprocess_and_store(
             self,
             content: bytes,
             filename: str,
     ) -> Dict[str, any]:
+        """Index in-memory content incrementally, see `aprocess_file`"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(filename).suffix) as tmp:
+            tmp.write(content)
+            path = tmp.name
 
-        ext = Path(filename).suffix.lower()
-        total_chunks = 0
+        try:
+            return await self.aprocess_file(path, filename)
+        finally:
+            Path(path).unlink(missing_ok=True)
 
-        if ext == ".pdf":
-            for texts, embeddings, page in self.doc_processor.stream_pdf_chunks(
-                    content, filename
-            ):
-                ids = [str(uuid.uuid4()) for _ in texts]
-                payloads = [
-                    {
-                        "text": t,
-                        "source": filename,
-                        "page": page,
-                    }
-                    for t in texts
-                ]
-
-                self.vector_db.upsert(
-                    ids=ids,
-                    vectors=embeddings,
-                    payloads=payloads,
-                )
+    async def aprocess_only(self, content: bytes, filename: str) -> Dict[str, any]:
+        """Chunk and embed a document without storing anything"""
+        texts = await asyncio.to_thread(self.doc_processor.chunk_small_file, content, filename)
+        embeddings = await self.ingestor.aembed_texts(texts)
+        return {
+            "status": "success",
+            "filename": filename,
+            "chunks_processed": len(texts),
+            "embedding_dim": len(embeddings[0]) if embeddings else self.ingestor.provider.dimension,
+            "saved_to_db": False,
+        }
+
+    async def aprocess_file(
+            self,
+            path: str,
+            filename: str,
+            progress: Optional[Callable[..., None]] = None,
+    ) -> Dict[str, any]:
+        """Index the file at `path` as `filename`, incrementally.
+
+        Points get deterministic ids and the document's manifest records
+        them, so a re-upload only embeds and upserts new or changed chunks
+        and deletes the ones that vanished. PDFs go through the staged
+        ingestion pipeline; other files are chunked in a worker thread.
+        `progress(**counters)` receives page / chunk counters as work is done.
+        Uploads and removals of the same filename run one at a time, so
+        they can't interleave their manifest reads and stale-point deletes.
+        """
+        async with self._source_lock(filename):
+            return await self._process_file(path, filename, progress)
 
-                total_chunks += len(texts)
+    async def remove_document(self, filename: str) -> int:
+        """Delete a document's points and registry entry; returns the number of points"""
+        async with self._source_lock(filename):
+            deleted = await self.async_vector_db.delete_by_source(filename)
+            await self.manifests.delete(filename)
+            return deleted
 
+    async def _process_file(
+            self,
+            path: str,
+            filename: str,
+            progress: Optional[Callable[..., None]],
+    ) -> Dict[str, any]:
+        ext = Path(filename).suffix.lower()
+        progress = progress or (lambda **counters: None)
+        file_hash = await asyncio.to_thread(file_content_hash, path)
+
+        manifest = await self.manifests.get(filename)
+        if manifest and manifest.get("content_hash") == file_hash:
             return {
                 "status": "success",
                 "filename": filename,
-                "chunks_processed": total_chunks,
+                "chunks_processed": manifest["chunk_count"],
                 "saved_to_db": True,
-                "streaming": True,
+                "streaming": ext == ".pdf",
+                "embedded": 0,
+                "unchanged": manifest["chunk_count"],
+                "deleted": 0,
             }
 
-        chunks, embeddings = self.doc_processor.process_small_file(content, filename)
+        legacy = manifest is None or "point_ids" not in manifest
+        known_ids = set() if legacy else set(manifest["point_ids"])
+        if legacy:
+            # Indexed before manifests existed: its random-id points are all stale
+            stale_candidates = set(await self.async_vector_db.get_ids_by_source(filename))
+        else:
+            stale_candidates = known_ids
+
+        pipeline_stats = None
+        pages = None
+        if ext == ".pdf":
+            pipeline = PdfIngestionPipeline(self.ingestor, self.async_vector_db, self.doc_processor.splitter)
+            pipeline_stats = await pipeline.run(path, filename, known_ids=known_ids, progress=progress)
+            point_ids = pipeline_stats.pop("point_ids")
+            embedded = pipeline_stats["embedded"]
+            pages = pipeline_stats["pages"]
+        else:
+            content = await asyncio.to_thread(Path(path).read_bytes)
+            point_ids, embedded = await self._store_small_file(content, filename, known_ids)
+            progress(chunks_total=len(point_ids), chunks_embedded=embedded, chunks_unchanged=len(point_ids) - embedded)
+
+        stale = list(stale_candidates - set(point_ids))
+        if stale:
+            await self.async_vector_db.delete_by_ids(stale)
+        await self.manifests.save(
+            filename, file_hash, point_ids,
+            pages=pages,
+            size_bytes=Path(path).stat().st_size,
+        )
 
-        ids = [str(uuid.uuid4()) for _ in chunks]
+        result = {
+            "status": "success",
+            "filename": filename,
+            "chunks_processed": len(point_ids),
+            "saved_to_db": True,
+            "streaming": ext == ".pdf",
+            "embedded": embedded,
+            "unchanged": len(point_ids) - embedded,
+            "deleted": len(stale),
+        }
+        if pipeline_stats is not None:
+            result["pipeline"] = pipeline_stats
+        return result
+
+    async def _store_small_file(self, content: bytes, filename: str, known_ids: set) -> Tuple[List[str], int]:
+        texts = await asyncio.to_thread(self.doc_processor.chunk_small_file, content, filename)
+        assign_id = ChunkIdAssigner(filename)
+        point_ids = [assign_id(None, text) for text in texts]
+
+        # Unchanged chunks keep their point (and payload) from the previous upload
+        new = [i for i, point_id in enumerate(point_ids) if point_id not in known_ids]
+        ids = [point_ids[i] for i in new]
         payloads = [
             {
-                "text": chunk,
+                "text": texts[i],
                 "source": filename,
                 "chunk_index": i,
-                "total_chunks": len(chunks),
+                "total_chunks": len(texts),
             }
-            for i, chunk in enumerate(chunks)
+            for i in new
         ]
+        embeddings = await self.ingestor.aembed_texts([texts[i] for i in new])
+        await self.async_vector_db.bulk_upsert(ids, embeddings, payloads)
 
-        self.vector_db.upsert(
-            ids=ids,
-            vectors=embeddings,
-            payloads=payloads,
-        )
-
-        return {
-            "status": "success",
-            "filename": filename,
-            "chunks_processed": len(chunks),
-            "saved_to_db": True,
-            "streaming": False,
-        }
+        return point_ids, len(ids)
 
     def ask_with_temporary_file(
             self,
@@ -247,80 +411,61 @@ class RAGService:
             top_k: int = 3
     ) -> Dict[str, any]:
         """
-        Geçici collection kullanarak dosya üzerinde soru-cevap yapar.
-        İşlem sonunda geçici veriler silinir.
+        Dosya üzerinde, Qdrant'a kaydetmeden soru-cevap yapar.
+        Chunk'lar sadece bu istek için bellekteki bir index'te tutulur.
         """
 
-        # Geçici collection oluştur (düzeltilmiş parametre: collection)
-        temp_db = QdrantStorage(collection_name=self.TEMP_COLLECTION_NAME)
-
-        # Her chunk için benzersiz UUID oluştur (Qdrant uyumlu format)
-        ids: List[str] = []
+        # Dosyayı işle
+        chunks, embeddings = self.doc_processor.process_small_file(content, filename)
+        index = InMemoryVectorIndex(embeddings, chunks)
 
-        try:
-            # Dosyayı işle
-            chunks, embeddings = self.doc_processor.process_file(content, filename)
-
-            # Her chunk için ayrı UUID oluştur (pure UUID format)
-            ids = [str(uuid.uuid4()) for _ in chunks]
-
-            payloads = [
-                {
-                    "text": chunk,
-                    "source": filename,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks)
-                }
-                for i, chunk in enumerate(chunks)
-            ]
-
-            # Geçici collection'a kaydet
-            temp_db.upsert(
-                ids=ids,
-                vectors=embeddings,
-                payloads=payloads
-            )
-
-            # Arama yap
-            result = self.search_engine.search_in_database(
-                query=question,
-                vector_db=temp_db,
-                top_k=top_k,
-                filename=filename
-            )
-
-            # Cevap üret
-            answer = self.llm_engine.generate_answer(
-                question=question,
-                contexts=result["contexts"],
-                sources=[filename]
-            )
+        # Arama yap
+        contexts = self.search_engine.search_index(question, index, top_k=top_k)
 
-            return {
-                "question": question,
-                "answer": answer,
-                "source": filename,
-                "contexts_used": len(result["contexts"]),
-                "total_chunks": len(chunks),
-                "temporary": True
-            }
+        # Cevap üret
+        answer = self.llm_engine.generate_answer(
+            question=question,
+            contexts=contexts,
+            sources=[filename]
+        )
 
-        finally:
-            # Response sonrası geçici verileri sil
-            if ids:  # Sadece ID'ler oluşturulduysa sil
-                self._cleanup_temp_data(temp_db, ids)
+        return {
+            "question": question,
+            "answer": answer,
+            "source": filename,
+            "contexts_used": len(contexts),
+            "total_chunks": len(chunks),
+            "temporary": True
+        }
 
-    def _cleanup_temp_data(
+    async def aask_with_temporary_file(
             self,
-            temp_db: QdrantStorage,
-            ids: List[str]
-    ) -> None:
-        """Geçici collection'dan belirtilen ID'leri siler."""
-        try:
-            temp_db.delete_by_ids(ids)
-        except Exception as e:
-            # Silme hatası olursa log tut ama işlemi durdurma
-            print(f"Warning: Failed to cleanup temp data: {e}")
+            question: str,
+            content: bytes,
+            filename: str,
+            top_k: int = 3
+    ) -> Dict[str, any]:
+        """`ask_with_temporary_file` without blocking the event loop"""
+        chunks = await asyncio.to_thread(self.doc_processor.chunk_small_file, content, filename)
+        embeddings = await self.ingestor.aembed_texts(chunks)
+        index = InMemoryVectorIndex(embeddings, chunks)
+
+        contexts = await self.search_engine.asearch_index(question, index, top_k=top_k)
+
+        answer = await self.llm_engine.agenerate_answer(
+            question=question,
+            contexts=contexts,
+            sources=[filename]
+        )
+
+        return {
+            "question": question,
+            "answer": answer,
+            "source": filename,
+            "contexts_used": len(contexts),
+            "total_chunks": len(chunks),
+            "temporary": True
+        }
 
     def search_in_database(self, query, top_k: Optional[int] = 3, filename: Optional[str] = None) -> Dict[str, any]:
         result = self.search_engine.search_in_database(
@@ -337,6 +482,21 @@ class RAGService:
             "contexts_used": list(result["contexts"]),
         }
 
+    async def asearch_in_database(self, query, top_k: Optional[int] = 3, filename: Optional[str] = None) -> Dict[str, any]:
+        result = await self.search_engine.asearch_in_database(
+            query=query,
+            vector_db=self.async_vector_db,
+            top_k=top_k,
+            filename=filename
+        )
+
+        return {
+            "question": query,
+            "source": result["sources"],
+            "contexts": result["contexts"],
+            "contexts_used": list(result["contexts"]),
+        }
+
     def ask_from_database(
             self,
             question: str,
@@ -365,8 +525,45 @@ class RAGService:
             "contexts_used": len(result["contexts"])
         }
 
-    def list_stored_files(self) -> List[str]:
-        return self.vector_db.list_sources()
+    async def aask_from_database(
+            self,
+            question: str,
+            top_k: int = 3,
+            filename: Optional[str] = None
+    ) -> Dict[str, any]:
+        """`ask_from_database` without blocking the event loop"""
+        result = await self.search_engine.asearch_in_database(
+            query=question,
+            vector_db=self.async_vector_db,
+            top_k=top_k,
+            filename=filename
+        )
+
+        answer = await self.llm_engine.agenerate_answer(
+            question=question,
+            contexts=result["contexts"],
+            sources=result["sources"]
+        )
+
+        return {
+            "question": question,
+            "answer": answer,
+            "sources": result["sources"],
+            "contexts": result["contexts"],
+            "contexts_used": len(result["contexts"])
+        }
+
+    async def list_stored_files(self) -> List[Dict[str, any]]:
+        """Documents from the registry; no Qdrant round trip"""
+        return await self.manifests.list_documents()
+
+    async def backfill_registry(self) -> int:
+        """Register sources that are in Qdrant but not in the registry"""
+        counts = await self.async_vector_db.count_by_source()
+        added = await self.manifests.backfill(counts)
+        if added:
+            print(f"Document registry: {added} existing sources registered")
+        return added
 
 
 __all__ = ["RAGService"]
\ No newline at end of file
@@ -0,0 +1,29 @@
+from functools import lru_cache
+
+from .rag_service import RAGService
+from .qdrant_storage import QdrantStorage
+
+
+@lru_cache(maxsize=None)
+def get_rag_service() -> RAGService:
+    """Process-wide RAG service, built on first use.
+
+    Its embedding provider, Qdrant client and LLM client hold pooled
+    connections; routers get it through `Depends(get_rag_service)`, tools
+    call it directly.
+    """
+    return RAGService()
+
+
+def get_vector_db() -> QdrantStorage:
+    return get_rag_service().vector_db
+
+
+async def close_services() -> None:
+    """Close the shared clients, if they were ever built"""
+    if get_rag_service.cache_info().currsize:
+        await get_rag_service().aclose()
+        get_rag_service.cache_clear()
+
+
+__all__ = ["get_rag_service", "get_vector_db", "close_services"]
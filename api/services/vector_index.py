@@ -0,0 +1,64 @@
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class InMemoryVectorIndex:
+    """Exact cosine-similarity index over a pre-normalized float32 matrix.
+
+    Rows are L2-normalized once at build time, so a query is one
+    matrix-vector product (matrix-matrix for a batch of queries) followed
+    by an `argpartition` top-k. Meant for ephemeral, per-request document
+    Q&A where a Qdrant round trip is not worth it.
+    """
+
+    def __init__(self, embeddings: Sequence[Sequence[float]], items: Optional[Sequence[Any]] = None):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.size == 0:
+            # No chunks: searches return nothing instead of failing on reshape
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        elif matrix.ndim != 2:
+            matrix = matrix.reshape(len(matrix), -1)
+        self.matrix = self._normalize(matrix)
+        self.items = list(items) if items is not None else list(range(len(self.matrix)))
+        if len(self.items) != len(self.matrix):
+            raise ValueError("items and embeddings must have the same length")
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k best scores along the last axis, best first"""
+        if k >= scores.shape[-1]:
+            return np.argsort(-scores, axis=-1)
+        top = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=-1), axis=-1)
+        return np.take_along_axis(top, order, axis=-1)
+
+    def search(self, query_vector: Sequence[float], top_k: int = 3) -> List[Tuple[Any, float]]:
+        """(item, cosine score) pairs, best first"""
+        return self.search_batch([query_vector], top_k)[0]
+
+    def search_batch(self, query_vectors: Sequence[Sequence[float]], top_k: int = 3) -> List[List[Tuple[Any, float]]]:
+        """Top-k results for several queries with one matrix product"""
+        if not len(self.matrix) or top_k <= 0:
+            return [[] for _ in query_vectors]
+
+        queries = self._normalize(np.asarray(query_vectors, dtype=np.float32))
+        scores = queries @ self.matrix.T
+        indices = self._top_k(scores, top_k)
+
+        return [
+            [(self.items[i], float(row_scores[i])) for i in row]
+            for row, row_scores in zip(indices, scores)
+        ]
+
+
+__all__ = ["InMemoryVectorIndex"]
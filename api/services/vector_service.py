@@ -1,8 +1,9 @@
+import asyncio
+import random
 import time
-from typing import List, Union
+from typing import List, Optional, Union
 from pathlib import Path
 
-from openai import OpenAI
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import (
@@ -11,32 +12,38 @@ from langchain_community.document_loaders import (
 )
 
 from config import (
-    OPENROUTER_API_HOST,
-    OPENROUTER_API_KEY,
-    BASE_EMBEDDING_MODEL,
+    EMBED_MAX_CONCURRENCY,
+    EMBED_BATCH_MAX_ITEMS,
+    EMBED_BATCH_MAX_TOKENS,
 )
+from .embedding_cache import EmbeddingCache, get_embedding_cache
+from .embedding_batcher import AdaptiveBatcher
+from .embedding_providers import EmbeddingProvider, get_embedding_provider
 
 
 class MultiSourceIngestor:
     def __init__(
         self,
-        embed_model: str = BASE_EMBEDDING_MODEL,
         chunk_size: int = 800,
         chunk_overlap: int = 100,
-        batch_size: int = 10,
+        batch_size: int = EMBED_BATCH_MAX_ITEMS,
+        max_batch_tokens: int = EMBED_BATCH_MAX_TOKENS,
         max_retries: int = 5,
         base_delay: float = 1.0,
+        max_concurrency: int = EMBED_MAX_CONCURRENCY,
+        cache: Optional[EmbeddingCache] = None,
+        provider: Optional[EmbeddingProvider] = None,
     ):
-        self.client = OpenAI(
-            base_url=OPENROUTER_API_HOST,
-            api_key=OPENROUTER_API_KEY,
-            timeout=60,
-        )
-
-        self.embed_model = embed_model
+        # Embedding backend (EMBED_PROVIDER); caching, batching and retries live here
+        self.provider = provider or get_embedding_provider()
+        self.embed_model = self.provider.model
+        self.model_key = self.provider.model_key
         self.batch_size = batch_size
+        self.batcher = AdaptiveBatcher(max_tokens=max_batch_tokens, max_items=batch_size)
         self.max_retries = max_retries
         self.base_delay = base_delay
+        self.max_concurrency = max_concurrency
+        self.cache = cache if cache is not None else get_embedding_cache()
 
         self.splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
@@ -74,32 +81,128 @@ class MultiSourceIngestor:
     # -------- embedding --------
 
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None:
+            return self._embed_uncached(texts)
+
+        cached = self.cache.get_many(self.model_key, texts)
+        missing = self._missing(texts, cached)
+        if not missing:
+            return cached
+
+        fresh = self._embed_uncached(missing)
+        self.cache.put_many(self.model_key, missing, fresh)
+        return self._merge(texts, cached, missing, fresh)
+
+    def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
         vectors: List[List[float]] = []
 
-        for i in range(0, len(texts), self.batch_size):
-            batch = texts[i:i + self.batch_size]
-            vectors.extend(self._embed_with_retry(batch))
+        for batch in self.batcher.plan(texts):
+            vectors.extend(self._embed_batch(batch))
 
         return vectors
 
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        try:
+            return self._embed_with_retry(batch)
+        except Exception as e:
+            if len(batch) == 1 or not self.batcher.is_size_error(e):
+                raise
+            # Too big for one request: shrink the limits and split this batch
+            self.batcher.shrink()
+            mid = len(batch) // 2
+            return self._embed_batch(batch[:mid]) + self._embed_batch(batch[mid:])
+
+    @property
+    def _attempts(self) -> int:
+        # Local providers fail deterministically, only network calls are retried
+        return self.max_retries if self.provider.remote else 1
+
     def _embed_with_retry(self, batch: List[str]) -> List[List[float]]:
-        for attempt in range(self.max_retries):
+        for attempt in range(self._attempts):
+            started = time.monotonic()
             try:
-                res = self.client.embeddings.create(
-                    model=self.embed_model,
-                    input=batch,
-                    extra_headers={
-                        "HTTP-Referer": "farukseker.com.tr",
-                        "X-Title": "farukseker",
-                    },
-                )
-                return [d.embedding for d in res.data]
-
-            except Exception:
-                if attempt == self.max_retries - 1:
+                vectors = self.provider.embed(batch)
+                self.batcher.record(batch, time.monotonic() - started, ok=True)
+                return vectors
+
+            except Exception as e:
+                self.batcher.record(batch, time.monotonic() - started, ok=False)
+                # Retrying the same oversized payload can't succeed
+                if attempt == self._attempts - 1 or self.batcher.is_size_error(e):
                     raise
                 time.sleep(self.base_delay * (2 ** attempt))
 
+    async def aembed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed asynchronously, up to `max_concurrency` batches in flight.
+
+        Vectors are returned in input order.
+        """
+        if self.cache is None:
+            return await self._aembed_uncached(texts)
+
+        cached = await asyncio.to_thread(self.cache.get_many, self.model_key, texts)
+        missing = self._missing(texts, cached)
+        if not missing:
+            return cached
+
+        fresh = await self._aembed_uncached(missing)
+        await asyncio.to_thread(self.cache.put_many, self.model_key, missing, fresh)
+        return self._merge(texts, cached, missing, fresh)
+
+    @staticmethod
+    def _missing(texts: List[str], cached: List[Optional[List[float]]]) -> List[str]:
+        """Unique texts without a cached vector, in first-seen order"""
+        return list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+
+    @staticmethod
+    def _merge(texts, cached, missing, fresh) -> List[List[float]]:
+        by_text = dict(zip(missing, fresh))
+        return [v if v is not None else by_text[t] for t, v in zip(texts, cached)]
+
+    async def _aembed_uncached(self, texts: List[str]) -> List[List[float]]:
+        # Batches are drawn lazily so a shrink() also applies to the rest of the run
+        batches = enumerate(self.batcher.plan(texts))
+        results = {}
+
+        async def run(batch: List[str]) -> List[List[float]]:
+            try:
+                return await self._aembed_with_retry(batch)
+            except Exception as e:
+                if len(batch) == 1 or not self.batcher.is_size_error(e):
+                    raise
+                self.batcher.shrink()
+                mid = len(batch) // 2
+                return await run(batch[:mid]) + await run(batch[mid:])
+
+        async def worker() -> None:
+            for index, batch in batches:
+                results[index] = await run(batch)
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, self.max_concurrency))]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            raise
+
+        return [vector for index in range(len(results)) for vector in results[index]]
+
+    async def _aembed_with_retry(self, batch: List[str]) -> List[List[float]]:
+        for attempt in range(self._attempts):
+            started = time.monotonic()
+            try:
+                vectors = await self.provider.aembed(batch)
+                self.batcher.record(batch, time.monotonic() - started, ok=True)
+                return vectors
+
+            except Exception as e:
+                self.batcher.record(batch, time.monotonic() - started, ok=False)
+                if attempt == self._attempts - 1 or self.batcher.is_size_error(e):
+                    raise
+                # Full jitter so concurrent batches don't retry in lockstep
+                await asyncio.sleep(random.uniform(0, self.base_delay * (2 ** attempt)))
+
     # -------- unified ingest --------
 
     def ingest(
@@ -0,0 +1,97 @@
+import asyncio
+
+import orjson
+
+from services.chat_runs import ChatRun, ChatRunRegistry
+
+
+def _parse(frame: bytes):
+    event_id, data = frame.decode().strip().split("\n")
+    return event_id.removeprefix("id: "), orjson.loads(data.removeprefix("data: "))
+
+
+async def _collect(run: ChatRun, last_seq: int = 0, delay: float = 0.0):
+    frames = []
+    async for frame in run.subscribe(last_seq):
+        frames.append(_parse(frame))
+        await asyncio.sleep(delay)
+    return frames
+
+
+async def _publish_all(run: ChatRun, payloads):
+    for payload in payloads:
+        await run.publish(payload)
+    await run.finish()
+
+
+def test_replays_frames_after_last_seq():
+    async def scenario():
+        run = ChatRun("chat-1", buffer_size=8)
+        await _publish_all(run, [{"type": "token", "content": c} for c in "abc"])
+        return run, await _collect(run, last_seq=1)
+
+    run, frames = asyncio.run(scenario())
+
+    assert [event_id for event_id, _ in frames] == [run.event_id(2), run.event_id(3)]
+    assert "".join(payload["content"] for _, payload in frames) == "bc"
+
+
+def test_reconnect_behind_the_buffer_gets_a_resync_snapshot():
+    async def scenario():
+        run = ChatRun("chat-1", buffer_size=2)
+        await _publish_all(run, [
+            {"type": "token", "content": "a"},
+            {"type": "tool_start", "tool": "search", "input": "q"},
+            {"type": "tool_end", "tool": "search", "content": "r"},
+            {"type": "token", "content": "b"},
+            {"type": "token", "content": "c"},
+        ])
+        return run, await _collect(run)
+
+    run, frames = asyncio.run(scenario())
+
+    (resync_id, resync), *rest = frames
+    assert resync_id == run.event_id(3)
+    assert resync["type"] == "resync"
+    assert resync["content"] == "a"
+    assert [event["type"] for event in resync["tools"]] == ["tool_start", "tool_end"]
+    assert [payload["content"] for _, payload in rest] == ["b", "c"]
+
+
+def test_slow_subscriber_resyncs_without_duplicating_text():
+    async def scenario():
+        run = ChatRun("chat-1", buffer_size=3)
+        reader = asyncio.create_task(_collect(run, delay=0.01))
+        await asyncio.sleep(0)
+        for i in range(10):
+            await run.publish({"type": "token", "content": str(i)})
+            await asyncio.sleep(0)
+        await run.finish()
+        return await reader
+
+    frames = asyncio.run(scenario())
+
+    # What a client renders: tokens appended, a resync replaces everything so far
+    text = ""
+    for _, payload in frames:
+        text = payload["content"] if payload["type"] == "resync" else text + payload["content"]
+    assert any(payload["type"] == "resync" for _, payload in frames)
+    assert text == "0123456789"
+
+
+def test_registry_resolves_the_resume_position():
+    async def scenario():
+        registry = ChatRunRegistry(retention_seconds=60)
+
+        async def payloads():
+            yield {"type": "done"}
+
+        run = registry.start("chat-1", payloads())
+        await run.task
+        return registry, run
+
+    registry, run = asyncio.run(scenario())
+
+    assert registry.resolve("chat-1", run.event_id(1)) == (run, 1)
+    assert registry.resolve("chat-1", None) == (run, 0)
+    assert registry.resolve("chat-2", run.event_id(1)) == (None, 0)
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.chat_runs import ChatRunRegistry
+from services.chat_scheduler import ChatScheduler, QueueFull, QueueTimeout
+
+
+def test_full_queue_rejects_with_retry_after():
+    scheduler = ChatScheduler(default_limit=1, queue_size=1, model_limits={})
+    running = scheduler.reserve("m")
+    queued = scheduler.reserve("m")
+
+    with pytest.raises(QueueFull) as exc:
+        scheduler.reserve("m")
+
+    assert running.granted and not queued.granted
+    assert exc.value.retry_after == 5  # no run times sampled yet
+    assert scheduler.metrics()["m"]["rejected"] == 1
+
+
+def test_chat_route_answers_429_with_retry_after(monkeypatch):
+    from routers import ai
+
+    monkeypatch.setattr(ai, "chat_scheduler", ChatScheduler(default_limit=0, queue_size=0, model_limits={}))
+    monkeypatch.setattr(ai, "chat_runs", ChatRunRegistry())
+    app = FastAPI()
+    app.include_router(ai.router)
+
+    response = TestClient(app).post("/ai/chat/chat-1", data={"question": "hi"})
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "5"
+
+
+def test_queued_ticket_times_out_and_leaves_the_queue():
+    async def scenario():
+        scheduler = ChatScheduler(default_limit=1, queue_size=2, model_limits={})
+        scheduler.reserve("m")
+        ticket = scheduler.reserve("m")
+
+        positions = []
+        with pytest.raises(QueueTimeout):
+            async for position in ticket.wait(timeout=0.05):
+                positions.append(position)
+        return scheduler, ticket, positions
+
+    scheduler, ticket, positions = asyncio.run(scenario())
+
+    assert positions == [1]
+    assert ticket.released
+    metrics = scheduler.metrics()["m"]
+    assert metrics["queued"] == 0
+    assert metrics["timed_out"] == 1
+
+
+def test_release_hands_the_slot_to_the_next_ticket():
+    async def scenario():
+        scheduler = ChatScheduler(default_limit=1, queue_size=2, model_limits={})
+        first = scheduler.reserve("m")
+        second = scheduler.reserve("m")
+        third = scheduler.reserve("m")
+
+        positions = third.wait(timeout=1).__aiter__()
+        assert await positions.__anext__() == 2
+        first.release()
+        first.release()  # idempotent: must not free a second slot
+        assert second.granted and not third.granted
+        assert await positions.__anext__() == 1
+        second.release()
+        with pytest.raises(StopAsyncIteration):
+            await positions.__anext__()
+        return scheduler, third
+
+    scheduler, third = asyncio.run(scenario())
+
+    assert third.granted
+    assert scheduler.metrics()["m"]["active"] == 1
+
+
+def test_model_lanes_are_isolated():
+    scheduler = ChatScheduler(default_limit=2, queue_size=1, model_limits={"slow": 1})
+    scheduler.reserve("slow")
+    queued = scheduler.reserve("slow")
+
+    fast = [scheduler.reserve("fast"), scheduler.reserve("fast")]
+
+    assert not queued.granted
+    assert all(ticket.granted for ticket in fast)
+    metrics = scheduler.metrics()
+    assert (metrics["slow"]["active"], metrics["slow"]["queued"]) == (1, 1)
+    assert (metrics["fast"]["active"], metrics["fast"]["queued"]) == (2, 0)
@@ -0,0 +1,75 @@
+import asyncio
+
+from utils.sse import SSEFramer, encode_event
+
+
+async def _payloads(items, delay: float = 0.0):
+    for item in items:
+        await asyncio.sleep(delay)
+        yield item
+
+
+async def _coalesce(framer: SSEFramer, payloads):
+    return [payload async for payload in framer.coalesce(payloads)]
+
+
+def test_tokens_within_a_window_become_one_frame():
+    framer = SSEFramer(flush_interval_ms=1000, flush_bytes=1024)
+    items = [{"type": "token", "content": c} for c in "hello"] + [{"type": "done"}]
+
+    result = asyncio.run(_coalesce(framer, _payloads(items)))
+
+    assert result == [{"type": "token", "content": "hello"}, {"type": "done"}]
+
+
+def test_other_events_flush_pending_tokens_in_order():
+    framer = SSEFramer(flush_interval_ms=1000, flush_bytes=1024)
+    items = [
+        {"type": "token", "content": "a"},
+        {"type": "tool_start", "tool": "search"},
+        {"type": "token", "content": "b"},
+        {"type": "token", "content": "c"},
+    ]
+
+    result = asyncio.run(_coalesce(framer, _payloads(items)))
+
+    assert result == [
+        {"type": "token", "content": "a"},
+        {"type": "tool_start", "tool": "search"},
+        {"type": "token", "content": "bc"},
+    ]
+
+
+def test_byte_budget_and_window_flush():
+    framer = SSEFramer(flush_interval_ms=1000, flush_bytes=4)
+    result = asyncio.run(_coalesce(framer, _payloads([{"type": "token", "content": c} for c in "abcdef"])))
+    assert [p["content"] for p in result] == ["abcd", "ef"]
+
+    framer = SSEFramer(flush_interval_ms=10, flush_bytes=1024)
+    result = asyncio.run(_coalesce(framer, _payloads([{"type": "token", "content": c} for c in "ab"], delay=0.05)))
+    assert [p["content"] for p in result] == ["a", "b"]
+
+
+def test_closing_the_framer_closes_the_producer():
+    closed = []
+
+    async def producer():
+        try:
+            yield {"type": "tool_start", "tool": "search"}
+            await asyncio.sleep(10)
+        finally:
+            closed.append(True)
+
+    async def scenario():
+        frames = SSEFramer(flush_interval_ms=1000).coalesce(producer())
+        await frames.__anext__()
+        await frames.aclose()
+
+    asyncio.run(scenario())
+
+    assert closed == [True]
+
+
+def test_encode_event_frame_layout():
+    assert encode_event({"type": "done"}) == b'data: {"type":"done"}\n\n'
+    assert encode_event({"type": "done"}, "run:3") == b'id: run:3\ndata: {"type":"done"}\n\n'
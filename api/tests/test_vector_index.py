@@ -0,0 +1,18 @@
+from services.vector_index import InMemoryVectorIndex
+
+
+def test_empty_index_returns_no_results():
+    index = InMemoryVectorIndex([], [])
+
+    assert len(index) == 0
+    assert index.search([0.1, 0.2, 0.3], top_k=3) == []
+    assert index.search_batch([[0.1, 0.2], [0.3, 0.4]], top_k=3) == [[], []]
+
+
+def test_search_orders_by_cosine_score():
+    index = InMemoryVectorIndex([[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]], ["x", "y", "xy"])
+
+    results = index.search([1.0, 0.1], top_k=2)
+
+    assert [item for item, _ in results] == ["x", "xy"]
+    assert results[0][1] > results[1][1]
@@ -1,3 +1,6 @@
+import asyncio
+import threading
+
 from langchain_core.tools import tool
 from typing import Annotated
 from services import YTDLManager, AudioTranscriber, SRTParser
@@ -13,7 +16,8 @@ async def youtube_video_to_into_text_provider(
     this tool converts the audio from the YouTube video into text.
     A YouTube URL must be provided.
     """
-    yt_response = yt_manager.download(youtube_url)
+    # Blocking work runs in threads so the agent run stays cancellable
+    yt_response = await asyncio.to_thread(yt_manager.download, youtube_url)
     if isinstance(yt_response, dict):
         raise RuntimeError(
             f"YT-DLP failed: {yt_response.get('details')}"
@@ -21,9 +25,17 @@ async def youtube_video_to_into_text_provider(
 
     if hasattr(yt_response, 'file_suffix') and getattr(yt_response, 'file_suffix') == ".mp3":
         transcriber = AudioTranscriber()
-        return transcriber.transcribe(
-            audio_path=yt_response.path,
-        )
+        cancel_event = threading.Event()
+        try:
+            return await asyncio.to_thread(
+                transcriber.transcribe,
+                audio_path=yt_response.path,
+                cancel_event=cancel_event,
+            )
+        except asyncio.CancelledError:
+            # Stop the worker thread at the next chunk boundary
+            cancel_event.set()
+            raise
 
     srt_parser = SRTParser(
         source=yt_response.path,
@@ -4,7 +4,7 @@ from typing import Optional
 from langchain.tools import tool
 from pydantic import Field, BaseModel
 
-from services import RAGService
+from services import get_rag_service
 
 class RagInput(BaseModel):
     query: str = Field(
@@ -18,17 +18,17 @@ class RagInput(BaseModel):
 
 
 @tool("rag_search_tool", args_schema=RagInput)
-def rag_search_tool(query: str, filename: str = None):
+async def rag_search_tool(query: str, filename: str = None):
     """
     Şirket içi dökümanlarda, veritabanına yüklenmiş dosyalarda arama yapar.
     Teknik sorular, şirket politikaları veya döküman içeriği sorulduğunda bunu kullan.
     """
     try:
-        rag_service = RAGService()
+        rag_service = get_rag_service()
 
         print(f"🛠️ RAG Tool Çalıştı: {query} (Dosya: {filename})")
 
-        result = rag_service.ask_from_database(
+        result = await rag_service.aask_from_database(
             question=query,
             top_k=3,
             filename=filename
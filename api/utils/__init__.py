@@ -1 +1,3 @@
-from .filter_messages_for_ui import filter_messages_for_ui
\ No newline at end of file
+from .filter_messages_for_ui import filter_messages_for_ui
+from .sse import SSEFramer, encode_event
+from .history_cursor import encode_cursor, decode_cursor
@@ -0,0 +1,28 @@
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+# Mongo stores naive UTC datetimes with millisecond precision
+_EPOCH = datetime(1970, 1, 1)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def encode_cursor(created_at: datetime, object_id: ObjectId) -> str:
+    """Opaque keyset cursor for a history message: (created_at, _id)"""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    millis = (created_at - _EPOCH) // _MILLISECOND
+    raw = f"{millis}:{object_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        millis, object_id = base64.urlsafe_b64decode(padded.encode()).decode().split(":", 1)
+        return _EPOCH + int(millis) * _MILLISECOND, ObjectId(object_id)
+    except (ValueError, InvalidId, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
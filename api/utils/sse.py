@@ -0,0 +1,91 @@
+import asyncio
+import time
+from typing import AsyncIterator, Optional
+
+import orjson
+
+from config import SSE_FLUSH_INTERVAL_MS, SSE_FLUSH_BYTES
+
+
+def encode_event(payload: dict, event_id: Optional[str] = None) -> bytes:
+    """Encode a payload as a single SSE frame"""
+    data = orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS)
+    if event_id is None:
+        return b"data: " + data + b"\n\n"
+    return b"id: " + event_id.encode() + b"\ndata: " + data + b"\n\n"
+
+
+class SSEFramer:
+    """Coalesces `token` payloads into one frame per time window or byte budget.
+
+    Every other event type (`tool_start`, `tool_end`, `token_usage`, `done`,
+    `error`, ...) flushes the pending tokens first and is passed through
+    unchanged, so the event order seen by the client is preserved.
+    """
+
+    def __init__(
+        self,
+        flush_interval_ms: int = SSE_FLUSH_INTERVAL_MS,
+        flush_bytes: int = SSE_FLUSH_BYTES,
+    ):
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_bytes = flush_bytes
+
+    async def coalesce(self, payloads: AsyncIterator[dict]) -> AsyncIterator[dict]:
+        """Merge consecutive token payloads, yielding payload dicts"""
+        buffer = []
+        buffered_bytes = 0
+        window_start = 0.0
+        iterator = payloads.__aiter__()
+        pending = None
+
+        def flush():
+            nonlocal buffer, buffered_bytes
+            merged = {"type": "token", "content": "".join(buffer)}
+            buffer, buffered_bytes = [], 0
+            return merged
+
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+
+                timeout = None
+                if buffer:
+                    timeout = max(0.0, window_start + self.flush_interval - time.monotonic())
+
+                # Wait on the same task across flushes, never cancel the upstream
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if not done:
+                    yield flush()
+                    continue
+
+                task, pending = pending, None
+                try:
+                    payload = task.result()
+                except StopAsyncIteration:
+                    break
+
+                if payload.get("type") == "token":
+                    if not buffer:
+                        window_start = time.monotonic()
+                    buffer.append(payload["content"])
+                    buffered_bytes += len(payload["content"].encode())
+                    if buffered_bytes >= self.flush_bytes:
+                        yield flush()
+                    continue
+
+                if buffer:
+                    yield flush()
+                yield payload
+
+            if buffer:
+                yield flush()
+        finally:
+            if pending is not None and not pending.done():
+                # Propagate cancellation into the producer and let it clean up
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+            # Closed while suspended at a yield: the producer is idle, close it now rather than at GC
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()